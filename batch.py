@@ -0,0 +1,180 @@
+"""八字 & 奇门批量排盘命令行工具
+
+用法:
+    python batch.py input.csv -o output.jsonl --mode both --workers 8
+
+输入: CSV（表头 year,month,day,hour[,gender]）或 JSONL（同名字段），按扩展名识别，"-" 为标准输入(JSONL)
+      gender 可写 男/女、M/F 或 male/female，空为男；其他取值写 error 行
+输出: JSONL，每行 {"input": {...}, "bazi": {...}, "qimen": {...}} 或 {"input": {...}, "error": "..."}，与输入同序
+
+输入按块流式读取，在途块数受限（workers × 2），大文件不会整体载入内存。
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+MODES = ("bazi", "qimen", "both")
+
+# 无法解析的输入行：原样带到输出，写一条 error 行占位
+InvalidRecord = namedtuple("InvalidRecord", ("line", "error"))
+
+# 性别字段的可接受写法（不区分大小写），空值按男
+GENDER_ALIASES = {
+    "男": "男", "m": "男", "male": "男",
+    "女": "女", "f": "女", "female": "女",
+}
+
+
+def read_records(path: str, fmt: str = ""):
+    """逐条读取输入记录（生成器）；JSONL 中无法解析的行产出 InvalidRecord，不中断整批"""
+    if not fmt:
+        fmt = "csv" if path.lower().endswith(".csv") else "jsonl"
+
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+    try:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield InvalidRecord(line, f"{type(e).__name__}: {e}")
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def chunked(records, size: int):
+    """把记录流切成定长块"""
+    chunk = []
+    for rec in records:
+        chunk.append(rec)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_gender(value) -> str:
+    """性别字段 → "男"/"女"；无法识别时抛出 ValueError"""
+    if value is None or str(value).strip() == "":
+        return "男"
+    gender = GENDER_ALIASES.get(str(value).strip().lower())
+    if gender is None:
+        raise ValueError(f"无法识别的性别 {value!r}（应为 男/女、M/F 或 male/female）")
+    return gender
+
+
+def process_record(rec: dict, mode: str) -> dict:
+    """排一条记录，返回输出行字典（单条出错不影响整批）"""
+    from bazi.calculator import calculate_bazi
+    from qimen.yinpan_engine import calculate_qimen
+    from shared.calendar_utils import get_day_context
+
+    if isinstance(rec, InvalidRecord):
+        return {"input": rec.line, "error": rec.error}
+
+    out = {"input": rec}
+    try:
+        year, month, day = int(rec["year"]), int(rec["month"]), int(rec["day"])
+        hour = int(rec.get("hour") or 0)
+        gender = parse_gender(rec.get("gender"))
+        ctx = get_day_context(year, month, day)
+        if mode in ("bazi", "both"):
+            out["bazi"] = calculate_bazi(year, month, day, hour, gender, ctx=ctx).to_dict()
+        if mode in ("qimen", "both"):
+            out["qimen"] = calculate_qimen(year, month, day, hour, ctx=ctx).to_dict()
+    except Exception as e:
+        out["error"] = f"{type(e).__name__}: {e}"
+    return out
+
+
+def process_chunk(args) -> list:
+    """进程池任务：排一块记录，返回已编码的 JSONL 行"""
+    chunk, mode = args
+    return [json.dumps(process_record(rec, mode), ensure_ascii=False) for rec in chunk]
+
+
+def _init_worker():
+    """预建节气表（已建好时为空操作）"""
+    from shared.calendar_utils import get_jieqi_table
+    get_jieqi_table()
+
+
+def run_batch(records, out, mode: str = "both", workers: int = 0,
+              chunk_size: int = 200, progress_every: float = 2.0) -> int:
+    """流式批量排盘，按输入顺序写出 JSONL，返回处理条数"""
+    # 主进程先建好节气表（单进程模式直接用；fork 启动的子进程可继承）
+    _init_worker()
+
+    workers = workers or os.cpu_count() or 1
+    total = 0
+    started = last_report = time.time()
+
+    def write(lines):
+        nonlocal total, last_report
+        for line in lines:
+            out.write(line + "\n")
+        total += len(lines)
+        now = time.time()
+        if progress_every and now - last_report >= progress_every:
+            last_report = now
+            rate = total / (now - started)
+            print(f"已处理 {total} 条（{rate:.0f} 条/秒）", file=sys.stderr)
+
+    chunks = ((chunk, mode) for chunk in chunked(records, chunk_size))
+    if workers == 1:
+        for args in chunks:
+            write(process_chunk(args))
+    else:
+        # spawn 启动（macOS/Windows 默认）的子进程不继承内存，由 initializer 各自预建节气表
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            pending = deque()
+            for args in chunks:
+                pending.append(pool.submit(process_chunk, args))
+                if len(pending) >= workers * 2:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+
+    elapsed = time.time() - started
+    print(f"完成：{total} 条，用时 {elapsed:.1f} 秒", file=sys.stderr)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="八字 & 奇门批量排盘")
+    parser.add_argument("input", help="输入文件（.csv 或 .jsonl，- 为标准输入）")
+    parser.add_argument("-o", "--output", default="-", help="输出 JSONL 文件（默认标准输出）")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="", help="输入格式（默认按扩展名）")
+    parser.add_argument("--mode", choices=MODES, default="both", help="排盘类型")
+    parser.add_argument("--workers", type=int, default=0, help="进程数（默认 CPU 核数，1 为单进程）")
+    parser.add_argument("--chunk-size", type=int, default=200, help="每个任务的记录数")
+    parser.add_argument("--progress", type=float, default=2.0, help="进度输出间隔秒数（0 关闭）")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        run_batch(
+            read_records(args.input, args.format), out,
+            mode=args.mode, workers=args.workers,
+            chunk_size=args.chunk_size, progress_every=args.progress,
+        )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
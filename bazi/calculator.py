@@ -1,47 +1,122 @@
 """八字四柱计算器"""
 
-from dataclasses import dataclass
+import struct
+from array import array
+from dataclasses import dataclass, field
 from typing import List
 from shared.ganzhi import (
-    TIANGAN, DIZHI, get_nayin, get_canggan, TIANGAN_WUXING,
-    TIANGAN_YINYANG, DIZHI_WUXING, hour_to_shichen_index,
-    SHICHEN_NAMES,
+    TIANGAN, DIZHI, JIAZI_60, WUXING, YINYANG, NAYIN_60, CANGGAN_NAMES,
+    TIANGAN_WUXING_IDX, TIANGAN_YINYANG_IDX, DIZHI_WUXING_IDX,
+    hour_to_shichen_index, hour_ganzhi_index, SHICHEN_NAMES,
 )
 from shared.calendar_utils import (
-    get_four_pillars_raw, get_lunar_date, find_surrounding_jie,
-    find_current_jieqi,
+    get_day_context, get_ganzhi_indices, LunarDate, JieqiInfo, EMPTY_JIEQI, JIEQI_NAMES,
 )
+from bazi.ten_gods import TEN_GODS, TEN_GOD_MATRIX, CANGGAN_TEN_GOD_MATRIX
 
 
-@dataclass
 class Pillar:
-    """单柱"""
-    tiangan: str       # 天干
-    dizhi: str         # 地支
-    canggan: list      # 藏干
-    nayin: str         # 纳音
-    ten_god: str = ""  # 十神（相对日主）
+    """单柱（六十甲子序号 + 所属日主，不可变）
+
+    实例按 (序号, 日主, 是否日柱) 驻留共享：未绑定日主的 60 个，绑定后至多 60 × 11 个，
+    十神、藏干等文字属性按需查共享表生成。
+    """
+    __slots__ = ("index", "day_master", "is_day_master")
+    _interned = {}
+
+    def __new__(cls, index: int, day_master: int = -1, is_day_master: bool = False):
+        key = (index, day_master, is_day_master)
+        pillar = cls._interned.get(key)
+        if pillar is None:
+            pillar = object.__new__(cls)
+            object.__setattr__(pillar, "index", index)                  # 六十甲子序号 0-59
+            object.__setattr__(pillar, "day_master", day_master)        # 日主天干序号，-1 未绑定
+            object.__setattr__(pillar, "is_day_master", is_day_master)  # 是否日柱本身
+            pillar = cls._interned.setdefault(key, pillar)
+        return pillar
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Pillar 只读")
+
+    def __delattr__(self, name):
+        raise AttributeError("Pillar 只读")
+
+    def __reduce__(self):
+        return Pillar, (self.index, self.day_master, self.is_day_master)
+
+    def __repr__(self):
+        return f"Pillar({self.ganzhi!r}, ten_god={self.ten_god!r})"
+
+    def bind(self, day_master: int, is_day_master: bool = False) -> "Pillar":
+        """绑定日主，返回带十神的同柱实例"""
+        return Pillar(self.index, day_master, is_day_master)
+
+    @property
+    def tg(self) -> int:
+        """天干序号"""
+        return self.index % 10
+
+    @property
+    def dz(self) -> int:
+        """地支序号"""
+        return self.index % 12
+
+    @property
+    def tiangan(self) -> str:
+        return TIANGAN[self.index % 10]
+
+    @property
+    def dizhi(self) -> str:
+        return DIZHI[self.index % 12]
 
     @property
     def ganzhi(self) -> str:
-        return self.tiangan + self.dizhi
+        return JIAZI_60[self.index]
+
+    @property
+    def canggan(self) -> tuple:
+        """藏干"""
+        return CANGGAN_NAMES[self.index % 12]
+
+    @property
+    def nayin(self) -> str:
+        """纳音"""
+        return NAYIN_60[self.index]
 
     @property
     def tg_wuxing(self) -> str:
-        return TIANGAN_WUXING.get(self.tiangan, "")
+        return WUXING[TIANGAN_WUXING_IDX[self.index % 10]]
 
     @property
     def dz_wuxing(self) -> str:
-        return DIZHI_WUXING.get(self.dizhi, "")
+        return WUXING[DIZHI_WUXING_IDX[self.index % 12]]
 
     @property
     def tg_yinyang(self) -> str:
-        return TIANGAN_YINYANG.get(self.tiangan, "")
+        return YINYANG[TIANGAN_YINYANG_IDX[self.index % 10]]
 
+    @property
+    def ten_god(self) -> str:
+        """十神（相对日主）"""
+        if self.is_day_master:
+            return "日主"
+        if self.day_master < 0:
+            return ""
+        return TEN_GODS[TEN_GOD_MATRIX[self.day_master][self.index % 10]]
 
-@dataclass
+    @property
+    def canggan_ten_gods(self) -> tuple:
+        """藏干十神（与 canggan 对应）"""
+        if self.day_master < 0:
+            return ()
+        return tuple(TEN_GODS[i] for i in CANGGAN_TEN_GOD_MATRIX[self.day_master][self.index % 12])
+
+
+@dataclass(frozen=True)
 class FourPillars:
     """四柱八字"""
+    __slots__ = ("year", "month", "day", "hour")
+
     year: Pillar
     month: Pillar
     day: Pillar    # 日主
@@ -52,92 +127,199 @@ class FourPillars:
         """日主天干"""
         return self.day.tiangan
 
+    @property
+    def day_master_index(self) -> int:
+        """日主天干序号"""
+        return self.day.tg
+
     def all_pillars(self) -> list:
         return [self.year, self.month, self.day, self.hour]
 
+    def __reduce__(self):
+        return FourPillars, (self.year, self.month, self.day, self.hour)
+
+
+# 二进制格式（小端）：标记 b"B"、格式版本、公历年月日时、性别、农历年月日/闰月/时辰、四柱序号、
+# 节气（序号 -1 为空）、大运方向/起运年龄/起运偏移（年、月、天）、大运步数与各步干支序号
+BAZI_BYTES_MAGIC = b"B"
+BAZI_BYTES_VERSION = 1
+_BAZI_HEADER = struct.Struct("<cBHBBBB" "HBBBB" "4B" "bHBBBBH" "BB3BB")
+_GENDERS = ("男", "女")
+_DIRECTIONS = ("顺", "逆")
+_NONE = 255  # 单字节字段"无"
+
 
-@dataclass
 class BaziChart:
     """完整八字盘"""
-    # 出生信息
-    solar_year: int
-    solar_month: int
-    solar_day: int
-    solar_hour: int
-    gender: str  # "男" / "女"
-
-    # 农历信息
-    lunar_info: dict
-
-    # 四柱
-    four_pillars: FourPillars
-
-    # 节气
-    jieqi_info: dict
-
-    # 大运（由 dayun 模块计算后填入）
-    dayun_list: list = None
-    start_dayun_age: int = 0
-    dayun_direction: str = ""  # "顺" / "逆"
-
-
-def build_pillar(ganzhi_str: str) -> Pillar:
-    """从干支字符串构建 Pillar"""
-    tg = ganzhi_str[0]
-    dz = ganzhi_str[1]
-    return Pillar(
-        tiangan=tg,
-        dizhi=dz,
-        canggan=get_canggan(dz),
-        nayin=get_nayin(ganzhi_str),
+    __slots__ = (
+        "solar_year", "solar_month", "solar_day", "solar_hour", "gender",
+        "lunar_info", "four_pillars", "jieqi_info",
+        "dayun_list", "start_dayun_age", "start_dayun_offset", "dayun_direction",
     )
 
+    def __init__(self, solar_year: int, solar_month: int, solar_day: int, solar_hour: int,
+                 gender: str, lunar_info: LunarDate, four_pillars: FourPillars,
+                 jieqi_info: JieqiInfo, dayun_list: list = None,
+                 start_dayun_age: int = 0, start_dayun_offset: tuple = (0, 0, 0),
+                 dayun_direction: str = ""):
+        # 出生信息
+        self.solar_year = solar_year
+        self.solar_month = solar_month
+        self.solar_day = solar_day
+        self.solar_hour = solar_hour
+        self.gender = gender  # "男" / "女"
+        # 农历信息（含时辰）
+        self.lunar_info = lunar_info
+        # 四柱
+        self.four_pillars = four_pillars
+        # 节气（与日历缓存共享的不可变记录）
+        self.jieqi_info = jieqi_info
+        # 大运（由 dayun 模块计算后填入）
+        self.dayun_list = dayun_list
+        self.start_dayun_age = start_dayun_age
+        self.start_dayun_offset = start_dayun_offset  # 精确起运：出生后 (年, 月, 天)
+        self.dayun_direction = dayun_direction  # "顺" / "逆"
+
+    def __repr__(self):
+        fp = self.four_pillars
+        return (f"BaziChart({self.solar_year}-{self.solar_month:02d}-{self.solar_day:02d} "
+                f"{self.solar_hour}时 {self.gender}, "
+                f"{fp.year.ganzhi} {fp.month.ganzhi} {fp.day.ganzhi} {fp.hour.ganzhi})")
+
+    def __eq__(self, other):
+        if not isinstance(other, BaziChart):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None  # 可变对象，同原 dataclass
+
+    def to_bytes(self) -> bytes:
+        """紧凑二进制编码（八步大运时 41 字节）；十神、纳音等派生字段不存储，还原时重新查表"""
+        fp = self.four_pillars
+        lunar = self.lunar_info
+        jq = self.jieqi_info
+        dayun = self.dayun_list or []
+        shichen = SHICHEN_NAMES.index(lunar.shichen) if lunar.shichen else _NONE
+        direction = _DIRECTIONS.index(self.dayun_direction) if self.dayun_direction else _NONE
+        header = _BAZI_HEADER.pack(
+            BAZI_BYTES_MAGIC, BAZI_BYTES_VERSION,
+            self.solar_year, self.solar_month, self.solar_day, self.solar_hour,
+            _GENDERS.index(self.gender),
+            lunar.year, lunar.month, lunar.day, bool(lunar.is_leap), shichen,
+            fp.year.index, fp.month.index, fp.day.index, fp.hour.index,
+            jq.index, jq.year, jq.month, jq.day, jq.hour, jq.minute, jq.days_since,
+            direction, self.start_dayun_age, *self.start_dayun_offset, len(dayun),
+        )
+        return header + bytes(d.index for d in dayun)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BaziChart":
+        """由 to_bytes 的结果还原；标记或版本不符时抛出 ValueError"""
+        if len(data) < _BAZI_HEADER.size:
+            raise ValueError("八字盘数据长度不足")
+        (magic, version, year, month, day, hour, gender,
+         l_year, l_month, l_day, l_leap, shichen,
+         year_gz, month_gz, day_gz, hour_gz,
+         jq_index, jq_year, jq_month, jq_day, jq_hour, jq_minute, jq_days,
+         direction, start_age, off_y, off_m, off_d, n_dayun,
+         ) = _BAZI_HEADER.unpack_from(data)
+        if magic != BAZI_BYTES_MAGIC or version != BAZI_BYTES_VERSION:
+            raise ValueError(f"不支持的八字盘数据格式: {magic!r} v{version}")
+        dayun_indices = data[_BAZI_HEADER.size:_BAZI_HEADER.size + n_dayun]
+        if len(dayun_indices) != n_dayun:
+            raise ValueError("八字盘数据长度不足")
+        if (gender >= len(_GENDERS) or not 1 <= l_month <= 12 or not 1 <= l_day <= 30
+                or (shichen != _NONE and shichen >= len(SHICHEN_NAMES))
+                or (direction != _NONE and direction >= len(_DIRECTIONS))
+                or not -1 <= jq_index < len(JIEQI_NAMES)
+                or max(year_gz, month_gz, day_gz, hour_gz, *dayun_indices) >= 60):
+            raise ValueError("八字盘数据损坏：取值越界")
+        jieqi_info = (JieqiInfo(jq_index, jq_year, jq_month, jq_day, jq_hour, jq_minute, jq_days)
+                      if jq_index >= 0 else EMPTY_JIEQI)
+        jieqi_info.date  # 交节日期不合法时抛出 ValueError
 
-def calculate_bazi(year: int, month: int, day: int, hour: int, gender: str = "男") -> BaziChart:
+        dm = day_gz % 10
+        from bazi.dayun import build_dayun_period
+        return cls(
+            solar_year=year, solar_month=month, solar_day=day, solar_hour=hour,
+            gender=_GENDERS[gender],
+            lunar_info=LunarDate(l_year, l_month, l_day, bool(l_leap),
+                                 SHICHEN_NAMES[shichen] if shichen != _NONE else ""),
+            four_pillars=FourPillars(
+                year=Pillar(year_gz, dm), month=Pillar(month_gz, dm),
+                day=Pillar(day_gz, dm, True), hour=Pillar(hour_gz, dm),
+            ),
+            jieqi_info=jieqi_info,
+            dayun_list=[build_dayun_period(idx, i, start_age, dm)
+                        for i, idx in enumerate(dayun_indices, 1)] or None,
+            start_dayun_age=start_age,
+            start_dayun_offset=(off_y, off_m, off_d),
+            dayun_direction=_DIRECTIONS[direction] if direction != _NONE else "",
+        )
+
+    def to_dict(self) -> dict:
+        """转为可 JSON 序列化的字典（干支等以文字输出）"""
+        def pillar_dict(p):
+            return {
+                "ganzhi": p.ganzhi, "ten_god": p.ten_god, "nayin": p.nayin,
+                "canggan": list(p.canggan), "canggan_ten_gods": list(p.canggan_ten_gods),
+            }
+
+        fp = self.four_pillars
+        return {
+            "solar": [self.solar_year, self.solar_month, self.solar_day, self.solar_hour],
+            "gender": self.gender,
+            "lunar": dict(self.lunar_info),
+            "pillars": {
+                "year": pillar_dict(fp.year), "month": pillar_dict(fp.month),
+                "day": pillar_dict(fp.day), "hour": pillar_dict(fp.hour),
+            },
+            "jieqi": {k: (v.isoformat() if k == "date" else v) for k, v in self.jieqi_info.items()},
+            "dayun_direction": self.dayun_direction,
+            "start_dayun_age": self.start_dayun_age,
+            "start_dayun_offset": list(self.start_dayun_offset),
+            "dayun": [
+                {"ganzhi": d.ganzhi, "nayin": d.nayin, "ten_god": d.ten_god,
+                 "start_age": d.start_age, "end_age": d.end_age}
+                for d in (self.dayun_list or [])
+            ],
+        }
+
+
+def calculate_bazi(year: int, month: int, day: int, hour: int, gender: str = "男",
+                   ctx=None) -> BaziChart:
     """计算完整八字
     year, month, day: 公历
     hour: 0-23小时
     gender: "男" / "女"
+    ctx: 可选的 DayContext，已解析当日历法时传入以复用
     """
-    # 获取四柱干支
-    raw = get_four_pillars_raw(year, month, day, hour)
-
-    # 构建四柱
-    year_p = build_pillar(raw["year"])
-    month_p = build_pillar(raw["month"])
-    day_p = build_pillar(raw["day"])
-    hour_p = build_pillar(raw["hour"])
+    # 当日历法上下文（四柱、农历、节气一次解析）
+    if ctx is None:
+        ctx = get_day_context(year, month, day)
 
+    # 构建四柱（直接绑定日主，十神、藏干十神随之确定）
+    dm = ctx.day_gz % 10
     four_pillars = FourPillars(
-        year=year_p,
-        month=month_p,
-        day=day_p,
-        hour=hour_p,
+        year=Pillar(ctx.year_gz, dm),
+        month=Pillar(ctx.month_gz, dm),
+        day=Pillar(ctx.day_gz, dm, True),
+        hour=Pillar(ctx.hour_gz(hour), dm),
     )
 
-    # 计算十神
-    from bazi.ten_gods import calculate_ten_gods
-    calculate_ten_gods(four_pillars)
-
-    # 农历信息
-    lunar = get_lunar_date(year, month, day)
-
     # 时辰
     shichen_idx = hour_to_shichen_index(hour)
     shichen_name = SHICHEN_NAMES[shichen_idx]
 
-    # 节气
-    jieqi = find_current_jieqi(year, month, day)
-
     chart = BaziChart(
         solar_year=year,
         solar_month=month,
         solar_day=day,
         solar_hour=hour,
         gender=gender,
-        lunar_info={**lunar, "shichen": shichen_name},
+        lunar_info=ctx.lunar.with_shichen(shichen_name),
         four_pillars=four_pillars,
-        jieqi_info=jieqi,
+        jieqi_info=ctx.jieqi,
     )
 
     # 计算大运
@@ -145,3 +327,72 @@ def calculate_bazi(year: int, month: int, day: int, hour: int, gender: str = "
     calculate_dayun(chart)
 
     return chart
+
+
+@dataclass
+class BaziBatch:
+    """批量八字的列式结果（各列按输入顺序排列，array 紧凑存储）
+
+    干支列为六十甲子序号，十神列为 bazi.ten_gods.TEN_GODS 序号。
+    """
+    year_gz: array = field(default_factory=lambda: array("b"))
+    month_gz: array = field(default_factory=lambda: array("b"))
+    day_gz: array = field(default_factory=lambda: array("b"))
+    hour_gz: array = field(default_factory=lambda: array("b"))
+    year_ten_god: array = field(default_factory=lambda: array("b"))
+    month_ten_god: array = field(default_factory=lambda: array("b"))
+    hour_ten_god: array = field(default_factory=lambda: array("b"))
+    dayun_forward: array = field(default_factory=lambda: array("b"))  # 1顺 0逆
+    start_dayun_age: array = field(default_factory=lambda: array("b"))
+
+    def __len__(self) -> int:
+        return len(self.day_gz)
+
+
+def calculate_bazi_batch(records, columnar: bool = False):
+    """批量计算八字
+    records: 可迭代的 (year, month, day, hour, gender)
+    columnar: False 返回 BaziChart 列表；True 返回 BaziBatch 列式结果（不含农历与大运明细，快得多）
+
+    同一日期的历法查询在批内只做一次。
+    """
+    if not columnar:
+        contexts = {}
+        charts = []
+        for year, month, day, hour, gender in records:
+            ctx = contexts.get((year, month, day))
+            if ctx is None:
+                ctx = contexts[(year, month, day)] = get_day_context(year, month, day)
+            charts.append(calculate_bazi(year, month, day, hour, gender, ctx=ctx))
+        return charts
+
+    from bazi.dayun import get_dayun_direction, calculate_start_age
+
+    days = {}         # (年, 月, 日) → (年柱, 月柱, 日柱)
+    start_ages = {}   # (年, 月, 日, 时, 方向) → 起运年龄
+    batch = BaziBatch()
+    for year, month, day, hour, gender in records:
+        key = (year, month, day)
+        gz = days.get(key)
+        if gz is None:
+            gz = days[key] = get_ganzhi_indices(year, month, day)
+        year_gz, month_gz, day_gz = gz
+        hour_gz = hour_ganzhi_index(day_gz, hour)
+
+        direction = get_dayun_direction(year_gz % 10, gender)
+        age_key = key + (hour, direction)
+        start_age = start_ages.get(age_key)
+        if start_age is None:
+            start_age = start_ages[age_key] = calculate_start_age(year, month, day, direction, hour)
+
+        ten_gods = TEN_GOD_MATRIX[day_gz % 10]
+        batch.year_gz.append(year_gz)
+        batch.month_gz.append(month_gz)
+        batch.day_gz.append(day_gz)
+        batch.hour_gz.append(hour_gz)
+        batch.year_ten_god.append(ten_gods[year_gz % 10])
+        batch.month_ten_god.append(ten_gods[month_gz % 10])
+        batch.hour_ten_god.append(ten_gods[hour_gz % 10])
+        batch.dayun_forward.append(direction == "顺")
+        batch.start_dayun_age.append(start_age)
+    return batch
@@ -1,88 +1,264 @@
 """大运流年计算"""
 
-from dataclasses import dataclass
-from datetime import date
-from shared.ganzhi import TIANGAN, DIZHI, JIAZI_60, get_nayin, TIANGAN_YINYANG
-from shared.calendar_utils import find_surrounding_jie
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from itertools import count, islice
+from shared.ganzhi import (
+    JIAZI_60, NAYIN_60, TIANGAN_YINYANG_IDX, solar_to_jdn, day_ganzhi_index,
+)
+from shared.calendar_utils import (
+    get_jieqi_table, get_solar_months, LRUCache,
+    JIEQI_TABLE_START_YEAR, JIEQI_TABLE_END_YEAR,
+)
+from bazi.ten_gods import get_ten_god_by_index, get_canggan_ten_gods
 
 
 @dataclass
 class DayunPeriod:
     """一步大运"""
-    ganzhi: str
-    nayin: str
+    index: int  # 六十甲子序号
     start_age: int
     end_age: int
+    ten_god: str = ""  # 大运天干十神（相对日主）
+    canggan_ten_gods: list = field(default_factory=list)  # 大运地支藏干十神
+
+    @property
+    def ganzhi(self) -> str:
+        return JIAZI_60[self.index]
+
+    @property
+    def nayin(self) -> str:
+        return NAYIN_60[self.index]
+
+
+def get_dayun_direction(year_tg: int, gender: str) -> str:
+    """判断排运方向：阳男阴女顺排，阴男阳女逆排
+    year_tg: 年干序号
+    """
+    year_yy = TIANGAN_YINYANG_IDX[year_tg]  # 0阳 1阴
+    if (year_yy == 0 and gender == "男") or (year_yy == 1 and gender == "女"):
+        return "顺"
+    return "逆"
+
+
+# 起运换算：3 天折 1 年，即交节时差每 4320 分钟折 1 年、360 分钟折 1 个月、12 分钟折 1 天
+MINUTES_PER_YEAR = 4320
+MINUTES_PER_MONTH = 360
+MINUTES_PER_DAY = 12
+
+# 起运时差缓存键 (年, 月, 日, 时, 方向) → 分钟数
+_start_minutes_cache = LRUCache(maxsize=16384)
+
+
+def _birth_jd(year: int, month: int, day: int, hour: int) -> float:
+    """出生时刻的儒略日（北京时间，与节气表一致）"""
+    return solar_to_jdn(year, month, day) - 0.5 + hour / 24
+
+
+def calculate_start_minutes(year: int, month: int, day: int, hour: int, direction: str) -> int:
+    """出生时刻到所在节令月的结束节（顺排）/ 起始节（逆排）的交节时刻的时差（分钟）
+
+    节令月按换月日二分（与月柱、大运干支同一边界）：交节当日、交节之前出生的已属新月，
+    逆排量到当日的节（相差不足一天），顺排量到下一个节。超出节气表范围时按 15 天计
+    """
+    def compute():
+        table = get_jieqi_table()
+        pos = bisect_right(table.month_days, date(year, month, day).toordinal()) - 1
+        target = pos + 1 if direction == "顺" else pos
+        if pos < 0 or target >= len(table.jie_jds):
+            return 15 * 1440  # 默认
+        return round(abs(table.jie_jds[target] - _birth_jd(year, month, day, hour)) * 1440)
+
+    return _start_minutes_cache.get_or_compute((year, month, day, hour, direction), compute)
+
+
+def minutes_to_start_offset(minutes: int) -> tuple:
+    """交节时差（分钟）→ 出生后起运的 (年, 月, 天)"""
+    years, rest = divmod(minutes, MINUTES_PER_YEAR)
+    months, rest = divmod(rest, MINUTES_PER_MONTH)
+    return years, months, rest // MINUTES_PER_DAY
+
+
+def minutes_to_start_age(minutes: int) -> int:
+    """交节时差（分钟）→ 起运年龄（按年四舍五入，至少1岁）"""
+    return max((minutes + MINUTES_PER_YEAR // 2) // MINUTES_PER_YEAR, 1)
+
+
+def calculate_start_offset(year: int, month: int, day: int, hour: int, direction: str) -> tuple:
+    """精确起运时间：出生后 (年, 月, 天) 起运"""
+    return minutes_to_start_offset(calculate_start_minutes(year, month, day, hour, direction))
+
+
+def calculate_start_age(year: int, month: int, day: int, direction: str, hour: int = 0) -> int:
+    """计算起运年龄（出生时刻到前/后一个节的时差按 3 天折 1 年，四舍五入，至少1岁）"""
+    return minutes_to_start_age(calculate_start_minutes(year, month, day, hour, direction))
+
+
+def start_age_cache_stats() -> dict:
+    """起运时差缓存统计"""
+    return _start_minutes_cache.stats()
 
 
 def calculate_dayun(chart):
     """计算大运并填入 chart 对象
 
     规则:
-    - 阳男阴女: 顺排（从出生日到下一个节的天数/3 = 起运年龄）
-    - 阴男阳女: 逆排（从出生日到上一个节的天数/3 = 起运年龄）
+    - 阳男阴女: 顺排（从出生时刻到本节令月结束节的时差，3 天折 1 年）
+    - 阴男阳女: 逆排（从出生时刻到本节令月起始节的时差，3 天折 1 年）
     """
-    year_tg = chart.four_pillars.year.tiangan
-    year_yy = TIANGAN_YINYANG[year_tg]
-    gender = chart.gender
-
-    # 判断排运方向
-    if (year_yy == "阳" and gender == "男") or (year_yy == "阴" and gender == "女"):
-        direction = "顺"
-    else:
-        direction = "逆"
-
+    direction = get_dayun_direction(chart.four_pillars.year.tg, chart.gender)
     chart.dayun_direction = direction
 
-    # 找前后节
-    jies = find_surrounding_jie(chart.solar_year, chart.solar_month, chart.solar_day)
-    birth_date = date(chart.solar_year, chart.solar_month, chart.solar_day)
-
-    if direction == "顺":
-        # 顺排：到下一个节的天数
-        if jies["next_jie"]:
-            delta_days = (jies["next_jie"]["date"] - birth_date).days
-        else:
-            delta_days = 15  # 默认
-    else:
-        # 逆排：到上一个节的天数
-        if jies["prev_jie"]:
-            delta_days = (birth_date - jies["prev_jie"]["date"]).days
-        else:
-            delta_days = 15
-
-    # 起运年龄：天数 / 3（四舍五入）
-    start_age = round(delta_days / 3)
-    if start_age < 1:
-        start_age = 1
-    chart.start_dayun_age = start_age
-
-    # 月柱干支在六十甲子中的位置
-    month_gz = chart.four_pillars.month.ganzhi
-    month_idx = JIAZI_60.index(month_gz)
+    minutes = calculate_start_minutes(
+        chart.solar_year, chart.solar_month, chart.solar_day, chart.solar_hour, direction,
+    )
+    chart.start_dayun_age = minutes_to_start_age(minutes)
+    chart.start_dayun_offset = minutes_to_start_offset(minutes)
 
     # 排8步大运
-    dayun_list = []
-    for i in range(1, 9):
-        if direction == "顺":
-            idx = (month_idx + i) % 60
-        else:
-            idx = (month_idx - i) % 60
-
-        gz = JIAZI_60[idx]
-        period = DayunPeriod(
-            ganzhi=gz,
-            nayin=get_nayin(gz),
-            start_age=start_age + (i - 1) * 10,
-            end_age=start_age + i * 10 - 1,
-        )
-        dayun_list.append(period)
+    chart.dayun_list = list(islice(iter_dayun(chart), 8))
+
+
+def iter_dayun(chart):
+    """从第一步起逐步产出大运（无限生成器，需先 calculate_dayun 定方向与起运年龄）"""
+    month_idx = chart.four_pillars.month.index  # 月柱干支在六十甲子中的位置
+    step = 1 if chart.dayun_direction == "顺" else -1
+    start_age = chart.start_dayun_age
+    dm = chart.four_pillars.day_master_index
+    for i in count(1):
+        yield build_dayun_period((month_idx + step * i) % 60, i, start_age, dm)
+
 
-    chart.dayun_list = dayun_list
+def build_dayun_period(index: int, step_no: int, start_age: int, day_master: int) -> DayunPeriod:
+    """第 step_no 步（从1起）大运，干支为 index，十神相对日主 day_master"""
+    return DayunPeriod(
+        index=index,
+        start_age=start_age + (step_no - 1) * 10,
+        end_age=start_age + step_no * 10 - 1,
+        ten_god=get_ten_god_by_index(day_master, index % 10),
+        canggan_ten_gods=get_canggan_ten_gods(day_master, index % 12),
+    )
+
+
+def get_liunian_index(year: int) -> int:
+    """获取流年六十甲子序号"""
+    # 基准：1984年为甲子年
+    return (year - 1984) % 60
 
 
 def get_liunian_ganzhi(year: int) -> str:
     """获取流年干支"""
-    # 基准：1984年为甲子年
-    idx = (year - 1984) % 60
-    return JIAZI_60[idx]
+    return JIAZI_60[get_liunian_index(year)]
+
+
+# ============ 大运 → 流年 → 流月 → 流日 时间线 ============
+DAYUN, LIUNIAN, LIUYUE, LIURI = "大运", "流年", "流月", "流日"
+
+
+@dataclass(frozen=True)
+class TimelineEntry:
+    """时间线上的一项（大运/流年/流月/流日）
+
+    start/end: 起止公历日期（end 不含）；流年、流月按节气表的立春及各节交接日划分，
+    大运按其首尾流年的立春划分；大运末年超出节气表（2100 年之后）时 end 为 None
+    age: 大运为起运年龄，其余为所属流年的年龄（流年公历年 - 出生年）
+    """
+    __slots__ = ("level", "index", "start", "end", "age", "day_master")
+
+    level: str
+    index: int       # 六十甲子序号
+    start: date
+    end: date        # 大运可为 None
+    age: int
+    day_master: int  # 日主天干序号
+
+    @property
+    def ganzhi(self) -> str:
+        return JIAZI_60[self.index]
+
+    @property
+    def nayin(self) -> str:
+        return NAYIN_60[self.index]
+
+    @property
+    def ten_god(self) -> str:
+        """天干十神（相对日主）"""
+        return get_ten_god_by_index(self.day_master, self.index % 10)
+
+    @property
+    def canggan_ten_gods(self) -> list:
+        """地支藏干十神"""
+        return get_canggan_ten_gods(self.day_master, self.index % 12)
+
+
+def _lichun(year: int) -> date:
+    """year 年立春（寅月起始日）"""
+    return get_solar_months(year)[0][0]
+
+
+def _year_end(year: int) -> date:
+    """立春年 year 的结束日（次年立春，不含）"""
+    return get_solar_months(year)[-1][1]
+
+
+def iter_liuyue(year: int, day_master: int, age: int = 0):
+    """产出立春年 year 的 12 个流月（寅月至丑月）"""
+    for start, end, month_gz in get_solar_months(year):
+        yield TimelineEntry(LIUYUE, month_gz, start, end, age, day_master)
+
+
+def iter_liuri(start: date, end: date, day_master: int, age: int = 0):
+    """产出 [start, end) 内逐日的流日"""
+    gz = day_ganzhi_index(solar_to_jdn(start.year, start.month, start.day))
+    current = start
+    while current < end:
+        nxt = current + timedelta(days=1)
+        yield TimelineEntry(LIURI, gz, current, nxt, age, day_master)
+        gz = (gz + 1) % 60
+        current = nxt
+
+
+def iter_timeline(chart, start_age: int = 0, end_age: int = 100,
+                  months: bool = True, days: bool = False):
+    """惰性产出 [start_age, end_age] 年龄段的时间线（深度优先）：
+    大运 → 其下各流年 → 每年 12 个流月 →（days=True 时）每月各流日
+
+    起运前的流年没有所属大运，直接产出。条目逐个生成，不会一次性展开全部。
+    需先 calculate_dayun（calculate_bazi 已完成）。
+    流年超出节气表范围（1899–2100）的部分截去；起始年已超出时在产出任何条目前抛出 ValueError。
+    """
+    dm = chart.four_pillars.day_master_index
+    birth_year = chart.solar_year
+    first_year = birth_year + start_age
+    if not JIEQI_TABLE_START_YEAR <= first_year <= JIEQI_TABLE_END_YEAR:
+        raise ValueError(f"{first_year} 年超出节气表范围")
+    end_age = min(end_age, JIEQI_TABLE_END_YEAR - birth_year)
+    dayun = iter_dayun(chart)
+    period = next(dayun)
+
+    for age in range(start_age, end_age + 1):
+        year = birth_year + age
+        while age > period.end_age:
+            period = next(dayun)
+        if period.start_age <= age and (age == period.start_age or age == start_age):
+            last_year = birth_year + period.end_age
+            yield TimelineEntry(
+                DAYUN, period.index,
+                _lichun(birth_year + period.start_age),
+                _year_end(last_year) if last_year <= JIEQI_TABLE_END_YEAR else None,
+                period.start_age, dm,
+            )
+
+        if not months:
+            yield TimelineEntry(LIUNIAN, get_liunian_index(year), _lichun(year), _year_end(year), age, dm)
+            continue
+
+        year_months = get_solar_months(year)
+        yield TimelineEntry(
+            LIUNIAN, get_liunian_index(year), year_months[0][0], year_months[-1][1], age, dm,
+        )
+        for start, end, month_gz in year_months:
+            yield TimelineEntry(LIUYUE, month_gz, start, end, age, dm)
+            if days:
+                yield from iter_liuri(start, end, dm, age)
@@ -1,5 +1,12 @@
 """八字 AI 解读 Prompt 模板"""
 
+from datetime import date
+
+
+def bazi_reading_variant() -> str:
+    """八字解读的存储变体：Prompt 含当前流年，已存解读按年份区分，跨年自动失效"""
+    return str(date.today().year)
+
 
 def build_bazi_prompt(chart) -> str:
     """构建八字解读的 Prompt"""
@@ -17,13 +24,14 @@ def build_bazi_prompt(chart) -> str:
     # 大运
     dayun_text = ""
     if chart.dayun_list:
-        dayun_text = f"起运年龄: {chart.start_dayun_age}岁，{chart.dayun_direction}排\n"
+        years, months, days = chart.start_dayun_offset
+        dayun_text = (f"起运年龄: {chart.start_dayun_age}岁（出生后{years}年{months}个月{days}天起运），"
+                      f"{chart.dayun_direction}排\n")
         for d in chart.dayun_list:
             dayun_text += f"  {d.start_age}-{d.end_age}岁: {d.ganzhi}（{d.nayin}）\n"
 
     # 流年
     from bazi.dayun import get_liunian_ganzhi
-    from datetime import date
     current_year = date.today().year
     liunian = get_liunian_ganzhi(current_year)
 
@@ -1,22 +1,23 @@
 """十神计算"""
 
-from shared.ganzhi import TIANGAN_WUXING, TIANGAN_YINYANG, WUXING_SHENG, WUXING_KE
+from shared.ganzhi import (
+    TIANGAN_INDEX, TIANGAN_WUXING_IDX, TIANGAN_YINYANG_IDX, WUXING,
+    WUXING_SHENG, WUXING_KE, CANGGAN_IDX,
+)
 
+# 十神序号 → 名称
+TEN_GODS = ["比肩", "劫财", "食神", "伤官", "偏财", "正财", "七杀", "正官", "偏印", "正印"]
+TEN_GOD_INDEX = {name: i for i, name in enumerate(TEN_GODS)}
 
-def get_ten_god(day_master: str, target: str) -> str:
-    """计算 target 天干相对于 day_master 的十神
-    day_master: 日主天干（如"甲"）
-    target: 目标天干（如"丙"）
-    返回: 十神名称
-    """
-    if day_master == target:
+
+def _derive_ten_god(dm_tg: int, tg: int) -> str:
+    """按五行生克、阴阳异同推导十神（只用于构建查表）"""
+    if dm_tg == tg:
         return "比肩"
 
-    wx_me = TIANGAN_WUXING[day_master]
-    wx_other = TIANGAN_WUXING[target]
-    yy_me = TIANGAN_YINYANG[day_master]
-    yy_other = TIANGAN_YINYANG[target]
-    same_yinyang = (yy_me == yy_other)
+    wx_me = WUXING[TIANGAN_WUXING_IDX[dm_tg]]
+    wx_other = WUXING[TIANGAN_WUXING_IDX[tg]]
+    same_yinyang = (TIANGAN_YINYANG_IDX[dm_tg] == TIANGAN_YINYANG_IDX[tg])
 
     # 同我五行
     if wx_me == wx_other:
@@ -37,11 +38,34 @@ def get_ten_god(day_master: str, target: str) -> str:
     return ""
 
 
-def calculate_ten_gods(four_pillars):
-    """为四柱设置十神（就地修改）"""
-    dm = four_pillars.day_master
+# 10×10 十神表: TEN_GOD_MATRIX[日主天干序号][目标天干序号] → 十神序号
+TEN_GOD_MATRIX = tuple(
+    tuple(TEN_GOD_INDEX[_derive_ten_god(dm, tg)] for tg in range(10))
+    for dm in range(10)
+)
+
+# 10×12 藏干十神表: CANGGAN_TEN_GOD_MATRIX[日主天干序号][地支序号] → 各藏干的十神序号元组
+CANGGAN_TEN_GOD_MATRIX = tuple(
+    tuple(tuple(TEN_GOD_MATRIX[dm][tg] for tg in CANGGAN_IDX[dz]) for dz in range(12))
+    for dm in range(10)
+)
+
+
+def get_ten_god(day_master: str, target: str) -> str:
+    """计算 target 天干相对于 day_master 的十神
+    day_master: 日主天干（如"甲"）
+    target: 目标天干（如"丙"）
+    返回: 十神名称
+    """
+    return TEN_GODS[TEN_GOD_MATRIX[TIANGAN_INDEX[day_master]][TIANGAN_INDEX[target]]]
+
+
+def get_ten_god_by_index(dm_tg: int, tg: int) -> str:
+    """按天干序号查十神（dm_tg: 日主天干序号, tg: 目标天干序号）"""
+    return TEN_GODS[TEN_GOD_MATRIX[dm_tg][tg]]
+
+
+def get_canggan_ten_gods(dm_tg: int, dz: int) -> list:
+    """按日主天干序号、地支序号查该地支各藏干的十神名称"""
+    return [TEN_GODS[i] for i in CANGGAN_TEN_GOD_MATRIX[dm_tg][dz]]
 
-    four_pillars.year.ten_god = get_ten_god(dm, four_pillars.year.tiangan)
-    four_pillars.month.ten_god = get_ten_god(dm, four_pillars.month.tiangan)
-    four_pillars.day.ten_god = "日主"
-    four_pillars.hour.ten_god = get_ten_god(dm, four_pillars.hour.tiangan)
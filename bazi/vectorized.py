@@ -0,0 +1,130 @@
+"""八字列式向量化引擎（NumPy，可选依赖）- 用于人群级统计
+
+规则与 bazi.calculator / bazi.ten_gods / bazi.dayun 一致：
+年柱立春定、月柱节定（共用节气索引表），日柱由儒略日数推算，时柱五鼠遁，
+十神查 TEN_GOD_MATRIX，起运年龄 = 出生时刻到所在节令月起始/结束节的分钟数 / 4320（3 天折 1 年，四舍五入，至少1岁）。
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from shared.calendar_utils import get_jieqi_table
+from shared.ganzhi import TIANGAN_WUXING_IDX, DIZHI_WUXING_IDX
+from bazi.ten_gods import TEN_GOD_MATRIX
+
+# date.toordinal() = 儒略日数 - 1721425
+_JDN_ORDINAL_OFFSET = 1721425
+
+_tables = None
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("bazi.vectorized 需要 numpy，请先 pip install numpy")
+
+
+def _get_tables() -> dict:
+    """节气表、十神表的 NumPy 版本（首次调用时构建）"""
+    global _tables
+    if _tables is None:
+        table = get_jieqi_table()
+        _tables = {
+            "month_days": np.asarray(table.month_days, dtype=np.int64),
+            "month_year_gz": np.asarray([gz[0] for gz in table.month_ganzhi], dtype=np.int8),
+            "month_gz": np.asarray([gz[1] for gz in table.month_ganzhi], dtype=np.int8),
+            "jie_jds": np.asarray(table.jie_jds, dtype=np.float64),
+            "ten_gods": np.asarray(TEN_GOD_MATRIX, dtype=np.int8),
+            "tg_wuxing": np.asarray(TIANGAN_WUXING_IDX, dtype=np.int8),
+            "dz_wuxing": np.asarray(DIZHI_WUXING_IDX, dtype=np.int8),
+        }
+    return _tables
+
+
+def _solar_to_jdn(years, months, days):
+    """公历日期数组 → 儒略日数数组（同 shared.ganzhi.solar_to_jdn）"""
+    a = (14 - months) // 12
+    y = years + 4800 - a
+    m = months + 12 * a - 3
+    return days + (153 * m + 2) // 5 + 365 * y + y // 4 - y // 100 + y // 400 - 32045
+
+
+def calculate_bazi_arrays(years, months, days, hours, genders=None) -> dict:
+    """批量计算四柱（列式）
+    years, months, days: 公历年月日数组
+    hours: 0-23 小时数组
+    genders: 可选，"男"/"女" 数组；给出时计算大运方向与起运年龄
+
+    返回 int8 数组字典:
+        year_tg/year_dz/month_tg/month_dz/day_tg/day_dz/hour_tg/hour_dz: 天干、地支序号
+        year_gz/month_gz/day_gz/hour_gz: 六十甲子序号
+        year_nayin/month_nayin/day_nayin/hour_nayin: 纳音序号（shared.ganzhi.NAYIN_NAMES）
+        year_ten_god/month_ten_god/hour_ten_god: 十神序号（bazi.ten_gods.TEN_GODS）
+        dayun_forward: 1顺 0逆（仅给出 genders 时）
+        start_dayun_age: 起运年龄（仅给出 genders 时）
+    日期超出节气表范围（1900–2100）时抛出 ValueError。
+    """
+    _require_numpy()
+    t = _get_tables()
+
+    years = np.asarray(years, dtype=np.int64)
+    months = np.asarray(months, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    hours = np.asarray(hours, dtype=np.int64)
+
+    jdn = _solar_to_jdn(years, months, days)
+    ordinals = jdn - _JDN_ORDINAL_OFFSET
+
+    # 年柱、月柱：按换月日二分
+    pos = np.searchsorted(t["month_days"], ordinals, side="right") - 1
+    if pos.size and (pos.min() < 0 or pos.max() >= len(t["month_days"]) - 1):
+        raise ValueError("日期超出节气表范围（1900–2100）")
+    year_gz = t["month_year_gz"][pos]
+    month_gz = t["month_gz"][pos]
+
+    # 日柱、时柱：纯算术
+    day_gz = ((jdn + 49) % 60).astype(np.int8)
+    hour_gz = (((day_gz.astype(np.int64) % 5) * 12 + (hours + 1) // 2) % 60).astype(np.int8)
+
+    result = {}
+    for name, gz in (("year", year_gz), ("month", month_gz), ("day", day_gz), ("hour", hour_gz)):
+        result[f"{name}_gz"] = gz
+        result[f"{name}_tg"] = gz % 10
+        result[f"{name}_dz"] = gz % 12
+        result[f"{name}_nayin"] = gz // 2
+
+    dm = result["day_tg"]
+    for name in ("year", "month", "hour"):
+        result[f"{name}_ten_god"] = t["ten_gods"][dm, result[f"{name}_tg"]]
+
+    if genders is not None:
+        male = np.asarray(genders) == "男"
+        yang_year = result["year_tg"] % 2 == 0
+        forward = yang_year == male
+
+        # 同 bazi.dayun.calculate_start_minutes：量到所在节令月（pos）的起始节/结束节
+        jie_jds = t["jie_jds"]
+        birth_jd = jdn - 0.5 + hours / 24
+        target = np.where(forward, pos + 1, pos)
+        # np.rint 与 Python round() 同为银行家舍入
+        minutes = np.rint(np.abs(jie_jds[target] - birth_jd) * 1440).astype(np.int64)
+        start_age = np.maximum((minutes + 2160) // 4320, 1)
+
+        result["dayun_forward"] = forward.astype(np.int8)
+        result["start_dayun_age"] = start_age.astype(np.int8)
+
+    return result
+
+
+def wuxing_counts(result: dict):
+    """统计每条记录八字（四干四支）中五行的个数
+    返回 (N, 5) int8 数组，列顺序同 shared.ganzhi.WUXING（木火土金水）
+    """
+    _require_numpy()
+    t = _get_tables()
+    wx = np.stack(
+        [t["tg_wuxing"][result[f"{name}_tg"]] for name in ("year", "month", "day", "hour")]
+        + [t["dz_wuxing"][result[f"{name}_dz"]] for name in ("year", "month", "day", "hour")]
+    )
+    return np.stack([(wx == k).sum(axis=0, dtype=np.int8) for k in range(5)], axis=1)
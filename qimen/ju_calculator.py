@@ -1,11 +1,24 @@
 """局数计算器 - 根据节气和三元确定阳遁/阴遁第X局"""
 
+from bisect import bisect_right
 from datetime import date, timedelta
-from shared.calendar_utils import find_current_jieqi, JIEQI_NAMES, get_day
-from shared.ganzhi import TIANGAN, DIZHI, JIAZI_60, find_xun_head
+from shared.calendar_utils import get_day_context, get_jieqi_table, JIEQI_NAMES, get_day
+from shared.ganzhi import (
+    JIAZI_60, JIAZI_INDEX, solar_to_jdn, day_ganzhi_index, hour_ganzhi_index,
+)
 from qimen.constants import JU_TABLE
 
 
+# 旬序号(六十甲子序号 // 10) → 元
+# 甲子(0)/甲午(3)旬上元，甲申(2)/甲寅(5)旬中元，甲戌(1)/甲辰(4)旬下元
+XUN_YUAN = ("上", "下", "中", "上", "下", "中")
+
+
+def get_yuan_from_day_index(day_gz: int) -> str:
+    """根据日柱六十甲子序号判断上中下元"""
+    return XUN_YUAN[day_gz // 10]
+
+
 def get_yuan_from_day_ganzhi(day_ganzhi: str) -> str:
     """根据日干支判断上中下元
     
@@ -14,18 +27,16 @@ def get_yuan_from_day_ganzhi(day_ganzhi: str) -> str:
     - 甲寅/甲申旬的日子 → 中元  
     - 甲辰/甲戌旬的日子 → 下元
     """
-    xun_head = find_xun_head(day_ganzhi)
-    if xun_head in ("甲子", "甲午"):
+    idx = JIAZI_INDEX.get(day_ganzhi)
+    if idx is None:
         return "上"
-    elif xun_head in ("甲寅", "甲申"):
-        return "中"
-    elif xun_head in ("甲辰", "甲戌"):
-        return "下"
-    return "上"
+    return get_yuan_from_day_index(idx)
 
 
-def calculate_ju(year: int, month: int, day: int, hour: int = 12) -> dict:
+def calculate_ju(year: int, month: int, day: int, hour: int = 12, ctx=None) -> dict:
     """计算奇门遁甲局数
+
+    ctx: 可选的 DayContext，调用方已解析当日历法时传入以复用
     
     返回: {
         "jieqi_index": int,      # sxtwl节气索引
@@ -36,8 +47,11 @@ def calculate_ju(year: int, month: int, day: int, hour: int = 12) -> dict:
         "days_since_jieqi": int, # 距节气天数
     }
     """
+    if ctx is None:
+        ctx = get_day_context(year, month, day)
+
     # 1. 找到当前所属节气
-    jieqi_info = find_current_jieqi(year, month, day)
+    jieqi_info = ctx.jieqi
     if not jieqi_info:
         # 降级：默认使用冬至上元阳遁1局
         return {
@@ -46,12 +60,10 @@ def calculate_ju(year: int, month: int, day: int, hour: int = 12) -> dict:
             "days_since_jieqi": 0,
         }
 
-    jq_idx = jieqi_info["index"]
+    jq_idx = jieqi_info.index
 
     # 2. 根据日干支判断上中下元
-    from shared.calendar_utils import get_day_ganzhi
-    day_gz = get_day_ganzhi(year, month, day)
-    yuan = get_yuan_from_day_ganzhi(day_gz)
+    yuan = get_yuan_from_day_index(ctx.day_gz)
 
     # 3. 查局数表
     if jq_idx in JU_TABLE:
@@ -62,10 +74,81 @@ def calculate_ju(year: int, month: int, day: int, hour: int = 12) -> dict:
 
     return {
         "jieqi_index": jq_idx,
-        "jieqi_name": jieqi_info["name"],
+        "jieqi_name": jieqi_info.name,
         "yuan": yuan,
         "dun_type": dun_type,
         "ju_number": ju_number,
         "days_since_jieqi": jieqi_info.get("days_since", 0),
-        "day_ganzhi": day_gz,
+        "day_ganzhi": JIAZI_60[ctx.day_gz],
     }
+
+
+class JuCursor:
+    """局数游标：按小时/按天推进，只在换日、换元（换旬）、交节时重算局数
+
+    用于时间序列与择时扫描，每步摊销 O(1)，不再逐时调用 calculate_ju。
+    结果与 calculate_ju 一致。
+    """
+
+    def __init__(self, year: int, month: int, day: int, hour: int = 0):
+        self._table = get_jieqi_table()
+        self.ordinal = date(year, month, day).toordinal()
+        self.hour = hour
+        self.day_gz = day_ganzhi_index(solar_to_jdn(year, month, day))
+
+        pos = bisect_right(self._table.days, self.ordinal) - 1
+        if pos < 0 or pos + 1 >= len(self._table.days):
+            raise ValueError("日期超出节气表范围")
+        self._term_pos = pos
+        self._update_ju()
+
+    @property
+    def date(self) -> date:
+        return date.fromordinal(self.ordinal)
+
+    @property
+    def hour_gz(self) -> int:
+        """当前时柱六十甲子序号"""
+        return hour_ganzhi_index(self.day_gz, self.hour)
+
+    @property
+    def days_since_jieqi(self) -> int:
+        return self.ordinal - self._table.days[self._term_pos]
+
+    def _update_ju(self):
+        """按当前节气、元重算局数"""
+        self.jieqi_index = self._table.entries[self._term_pos][6]
+        self.yuan = get_yuan_from_day_index(self.day_gz)
+        self.dun_type, self.ju_number = JU_TABLE[self.jieqi_index][self.yuan]
+
+    def next_day(self):
+        """推进到下一天（小时不变）"""
+        self.ordinal += 1
+        self.day_gz = (self.day_gz + 1) % 60
+        changed = self.day_gz % 10 == 0  # 换旬即换元
+        while self.ordinal >= self._table.days[self._term_pos + 1]:
+            self._term_pos += 1
+            if self._term_pos + 1 >= len(self._table.days):
+                raise ValueError("日期超出节气表范围")
+            changed = True
+        if changed:
+            self._update_ju()
+
+    def next_hour(self, step: int = 1):
+        """推进 step 小时，跨零点时自动换日"""
+        self.hour += step
+        while self.hour >= 24:
+            self.hour -= 24
+            self.next_day()
+
+    def ju_info(self) -> dict:
+        """当前局数信息，格式同 calculate_ju"""
+        return {
+            "jieqi_index": self.jieqi_index,
+            "jieqi_name": JIEQI_NAMES[self.jieqi_index],
+            "yuan": self.yuan,
+            "dun_type": self.dun_type,
+            "ju_number": self.ju_number,
+            "days_since_jieqi": self.days_since_jieqi,
+            "day_ganzhi": JIAZI_60[self.day_gz],
+        }
@@ -1,30 +1,106 @@
-"""九宫数据结构"""
+"""九宫数据结构
 
-from dataclasses import dataclass, field
-from qimen.constants import PALACE_NAMES, PALACE_DIRECTIONS, STAR_JIXI, DOOR_JIXI
+盘面（地盘、天盘、九星、八门、八神）以小整数元组存于共享的 QimenPlate，
+Palace / QimenChart 只是带 __slots__ 的轻量视图，名称、方位、吉凶按序号查共享表。
+"""
+
+import struct
+from dataclasses import dataclass
+from shared.ganzhi import TIANGAN, JIAZI_60
+from shared.calendar_utils import JIEQI_NAMES
+from qimen.constants import (
+    PALACE_NAMES, PALACE_DIRECTIONS, STAR_JIXI, DOOR_JIXI,
+    STAR_LIST, DOOR_LIST, EIGHT_GODS,
+)
+
+# 序号 → 名称；末尾追加空串，序号 -1 表示"无"
+STEM_NAMES = tuple(TIANGAN) + ("",)
+STAR_NAMES = tuple(STAR_LIST) + ("",)
+DOOR_NAMES = tuple(DOOR_LIST) + ("",)
+GOD_NAMES = tuple(EIGHT_GODS) + ("",)
+
+
+@dataclass(frozen=True)
+class QimenPlate:
+    """盘面布局（只由 阴阳遁 + 局数 + 时柱 决定，可在多张盘之间共享）
+    dipan/tianpan/stars/doors/gods 为序号元组，以宫位号为下标（下标0不用，-1 表示无）：
+    dipan/tianpan → STEM_NAMES, stars → STAR_NAMES, doors → DOOR_NAMES, gods → GOD_NAMES
+    """
+    dun_type: str
+    ju_number: int
+    hour_gz: int        # 时柱六十甲子序号
+    dipan: tuple
+    tianpan: tuple
+    stars: tuple
+    doors: tuple
+    gods: tuple
+    zhifu_star: str
+    zhishi_door: str
+    zhifu_palace: int   # 值符（值使）落宫
+
+    def palace(self, number: int) -> "Palace":
+        return Palace(self, number)
 
 
-@dataclass
 class Palace:
-    """单个宫位"""
-    number: int        # 宫位序号 1-9
-    name: str = ""     # 坎宫/坤宫...
-    direction: str = ""
+    """单个宫位（QimenPlate 上某一宫的只读视图）"""
+    __slots__ = ("plate", "number")
+
+    def __init__(self, plate: QimenPlate, number: int):
+        object.__setattr__(self, "plate", plate)
+        object.__setattr__(self, "number", number)  # 宫位序号 1-9
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Palace 只读")
+
+    def __eq__(self, other):
+        return (isinstance(other, Palace)
+                and self.number == other.number and self.plate == other.plate)
+
+    def __hash__(self):
+        return hash((self.plate, self.number))
+
+    def __repr__(self):
+        return (f"Palace(number={self.number}, dipan={self.dipan!r}, tianpan={self.tianpan!r}, "
+                f"star={self.star!r}, door={self.door!r}, god={self.god!r})")
+
+    @property
+    def name(self) -> str:
+        return PALACE_NAMES.get(self.number, "")  # 坎宫/坤宫...
+
+    @property
+    def direction(self) -> str:
+        return PALACE_DIRECTIONS.get(self.number, "")
+
+    @property
+    def dipan(self) -> str:
+        return STEM_NAMES[self.plate.dipan[self.number]]    # 地盘奇仪
+
+    @property
+    def tianpan(self) -> str:
+        return STEM_NAMES[self.plate.tianpan[self.number]]  # 天盘奇仪
+
+    @property
+    def star(self) -> str:
+        return STAR_NAMES[self.plate.stars[self.number]]    # 九星
 
-    dipan: str = ""    # 地盘奇仪
-    tianpan: str = ""  # 天盘奇仪
-    star: str = ""     # 九星
-    door: str = ""     # 八门
-    god: str = ""      # 八神
+    @property
+    def door(self) -> str:
+        return DOOR_NAMES[self.plate.doors[self.number]]    # 八门
 
-    is_zhifu: bool = False   # 是否值符所在宫
-    is_zhishi: bool = False  # 是否值使所在宫
+    @property
+    def god(self) -> str:
+        return GOD_NAMES[self.plate.gods[self.number]]      # 八神
 
-    def __post_init__(self):
-        if not self.name:
-            self.name = PALACE_NAMES.get(self.number, "")
-        if not self.direction:
-            self.direction = PALACE_DIRECTIONS.get(self.number, "")
+    @property
+    def is_zhifu(self) -> bool:
+        """是否值符所在宫"""
+        return self.number == self.plate.zhifu_palace
+
+    @property
+    def is_zhishi(self) -> bool:
+        """是否值使所在宫"""
+        return self.number == self.plate.zhifu_palace
 
     @property
     def star_jixi(self) -> str:
@@ -35,35 +111,179 @@ class Palace:
         return DOOR_JIXI.get(self.door, "")
 
 
-@dataclass
+# 二进制格式（小端）：标记 b"Q"、格式版本、公历年月日时、四柱、节气、元、遁、局、值符星、值使门、值符落宫，
+# 之后为地盘/天盘/九星/八门/八神各 9 宫的序号（共 45 字节），余下为 UTF-8 编码的 AI 解读
+QIMEN_BYTES_MAGIC = b"Q"
+QIMEN_BYTES_VERSION = 1
+_QIMEN_HEADER = struct.Struct("<cBHBBB4BBBBBBBB")
+_QIMEN_LAYERS = struct.Struct("<45b")
+_YUAN_NAMES = ("上", "中", "下")
+_DUN_NAMES = ("阳", "阴")
+
+
 class QimenChart:
-    """完整奇门盘"""
-    # 时间信息
-    solar_year: int = 0
-    solar_month: int = 0
-    solar_day: int = 0
-    solar_hour: int = 0
-
-    # 干支信息
-    year_gz: str = ""
-    month_gz: str = ""
-    day_gz: str = ""
-    hour_gz: str = ""
-
-    # 局信息
-    jieqi_name: str = ""
-    yuan: str = ""        # 上/中/下
-    dun_type: str = ""    # 阳/阴
-    ju_number: int = 0
-
-    # 值符值使
-    zhifu_star: str = ""
-    zhishi_door: str = ""
-    zhifu_palace: int = 0
-    zhishi_palace: int = 0
-
-    # 九宫
-    palaces: dict = field(default_factory=dict)  # {1: Palace, 2: Palace, ...}
-
-    # AI 解读
-    ai_reading: str = ""
+    """完整奇门盘
+
+    ganzhi: 年、月、日、时柱六十甲子序号
+    jieqi_index: sxtwl 节气索引
+    plate: 共享盘面（局数、九宫、值符值使）
+    """
+    __slots__ = (
+        "solar_year", "solar_month", "solar_day", "solar_hour",
+        "ganzhi", "jieqi_index", "yuan", "plate", "ai_reading",
+    )
+
+    def __init__(self, solar_year: int, solar_month: int, solar_day: int, solar_hour: int,
+                 ganzhi: tuple, jieqi_index: int, yuan: str, plate: QimenPlate,
+                 ai_reading: str = ""):
+        # 时间信息
+        self.solar_year = solar_year
+        self.solar_month = solar_month
+        self.solar_day = solar_day
+        self.solar_hour = solar_hour
+        # 干支、局信息
+        self.ganzhi = ganzhi
+        self.jieqi_index = jieqi_index
+        self.yuan = yuan        # 上/中/下
+        self.plate = plate
+        # AI 解读
+        self.ai_reading = ai_reading
+
+    def __repr__(self):
+        return (f"QimenChart({self.solar_year}-{self.solar_month:02d}-{self.solar_day:02d} "
+                f"{self.solar_hour}时, {self.dun_type}遁{self.ju_number}局)")
+
+    def __eq__(self, other):
+        if not isinstance(other, QimenChart):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None  # 可变对象，同原 dataclass
+
+    @property
+    def year_gz(self) -> str:
+        return JIAZI_60[self.ganzhi[0]]
+
+    @property
+    def month_gz(self) -> str:
+        return JIAZI_60[self.ganzhi[1]]
+
+    @property
+    def day_gz(self) -> str:
+        return JIAZI_60[self.ganzhi[2]]
+
+    @property
+    def hour_gz(self) -> str:
+        return JIAZI_60[self.ganzhi[3]]
+
+    @property
+    def jieqi_name(self) -> str:
+        return JIEQI_NAMES[self.jieqi_index]
+
+    @property
+    def dun_type(self) -> str:
+        return self.plate.dun_type   # 阳/阴
+
+    @property
+    def ju_number(self) -> int:
+        return self.plate.ju_number
+
+    @property
+    def zhifu_star(self) -> str:
+        return self.plate.zhifu_star
+
+    @property
+    def zhishi_door(self) -> str:
+        return self.plate.zhishi_door
+
+    @property
+    def zhifu_palace(self) -> int:
+        return self.plate.zhifu_palace
+
+    @property
+    def zhishi_palace(self) -> int:
+        return self.plate.zhifu_palace
+
+    @property
+    def palaces(self) -> dict:
+        """九宫视图 {1: Palace, 2: Palace, ...}"""
+        plate = self.plate
+        return {num: Palace(plate, num) for num in range(1, 10)}
+
+    def to_bytes(self) -> bytes:
+        """紧凑二进制编码（不含 AI 解读时 63 字节）"""
+        plate = self.plate
+        header = _QIMEN_HEADER.pack(
+            QIMEN_BYTES_MAGIC, QIMEN_BYTES_VERSION,
+            self.solar_year, self.solar_month, self.solar_day, self.solar_hour,
+            *self.ganzhi, self.jieqi_index, _YUAN_NAMES.index(self.yuan),
+            _DUN_NAMES.index(plate.dun_type), plate.ju_number,
+            STAR_NAMES.index(plate.zhifu_star), DOOR_NAMES.index(plate.zhishi_door),
+            plate.zhifu_palace,
+        )
+        layers = _QIMEN_LAYERS.pack(
+            *plate.dipan[1:], *plate.tianpan[1:], *plate.stars[1:], *plate.doors[1:], *plate.gods[1:],
+        )
+        return header + layers + self.ai_reading.encode("utf-8")
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "QimenChart":
+        """由 to_bytes 的结果还原；标记或版本不符时抛出 ValueError"""
+        if len(data) < _QIMEN_HEADER.size + _QIMEN_LAYERS.size:
+            raise ValueError("奇门盘数据长度不足")
+        (magic, version, year, month, day, hour, year_gz, month_gz, day_gz, hour_gz,
+         jieqi_index, yuan, dun, ju_number, zhifu_star, zhishi_door, zhifu_palace,
+         ) = _QIMEN_HEADER.unpack_from(data)
+        if magic != QIMEN_BYTES_MAGIC or version != QIMEN_BYTES_VERSION:
+            raise ValueError(f"不支持的奇门盘数据格式: {magic!r} v{version}")
+        if (yuan >= len(_YUAN_NAMES) or dun >= len(_DUN_NAMES) or not 1 <= ju_number <= 9
+                or zhifu_star >= len(STAR_NAMES) or zhishi_door >= len(DOOR_NAMES)
+                or not 1 <= zhifu_palace <= 9 or jieqi_index >= len(JIEQI_NAMES)
+                or max(year_gz, month_gz, day_gz, hour_gz) >= 60):
+            raise ValueError("奇门盘数据损坏：取值越界")
+        layers = _QIMEN_LAYERS.unpack_from(data, _QIMEN_HEADER.size)
+        for i, names in enumerate((STEM_NAMES, STEM_NAMES, STAR_NAMES, DOOR_NAMES, GOD_NAMES)):
+            if not all(-1 <= v < len(names) - 1 for v in layers[i * 9:i * 9 + 9]):
+                raise ValueError("奇门盘数据损坏：取值越界")
+        dipan, tianpan, stars, doors, gods = (
+            (-1,) + layers[i:i + 9] for i in range(0, 45, 9)
+        )
+        plate = QimenPlate(
+            dun_type=_DUN_NAMES[dun], ju_number=ju_number, hour_gz=hour_gz,
+            dipan=dipan, tianpan=tianpan, stars=stars, doors=doors, gods=gods,
+            zhifu_star=STAR_NAMES[zhifu_star], zhishi_door=DOOR_NAMES[zhishi_door],
+            zhifu_palace=zhifu_palace,
+        )
+        # 与引擎缓存中的盘面相同则共用
+        from qimen.yinpan_engine import get_plate
+        cached = get_plate(plate.dun_type, ju_number, hour_gz)
+        if cached == plate:
+            plate = cached
+        return cls(
+            year, month, day, hour,
+            ganzhi=(year_gz, month_gz, day_gz, hour_gz),
+            jieqi_index=jieqi_index, yuan=_YUAN_NAMES[yuan], plate=plate,
+            ai_reading=data[_QIMEN_HEADER.size + _QIMEN_LAYERS.size:].decode("utf-8"),
+        )
+
+    def to_dict(self) -> dict:
+        """转为可 JSON 序列化的字典"""
+        return {
+            "solar": [self.solar_year, self.solar_month, self.solar_day, self.solar_hour],
+            "ganzhi": [self.year_gz, self.month_gz, self.day_gz, self.hour_gz],
+            "jieqi_name": self.jieqi_name,
+            "yuan": self.yuan,
+            "dun_type": self.dun_type,
+            "ju_number": self.ju_number,
+            "zhifu_star": self.zhifu_star,
+            "zhishi_door": self.zhishi_door,
+            "zhifu_palace": self.zhifu_palace,
+            "zhishi_palace": self.zhishi_palace,
+            "palaces": {
+                num: {
+                    "dipan": p.dipan, "tianpan": p.tianpan, "star": p.star,
+                    "door": p.door, "god": p.god,
+                }
+                for num, p in self.palaces.items()
+            },
+        }
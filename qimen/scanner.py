@@ -0,0 +1,98 @@
+"""奇门择时扫描 - 在日期范围内逐时辰查找符合条件的宫位"""
+
+from dataclasses import dataclass
+from datetime import date
+from shared.ganzhi import JIAZI_60, SHICHEN_NAMES, hour_to_shichen_index, hour_ganzhi_index
+from qimen.constants import PALACE_NAMES, PALACE_DIRECTIONS
+from qimen.ju_calculator import JuCursor
+from qimen.palace import STEM_NAMES, STAR_NAMES, DOOR_NAMES, GOD_NAMES
+from qimen.yinpan_engine import get_plate
+
+# 每天扫描的起始小时：早子时(0点)、丑至亥时、晚子时(23点，时柱已换次日日干)
+SCAN_HOURS = (0, 1, 3, 5, 7, 9, 11, 13, 15, 17, 19, 21, 23)
+
+
+@dataclass
+class ScanHit:
+    """一个符合条件的时辰 + 宫位"""
+    year: int
+    month: int
+    day: int
+    hour: int           # 时段起始小时
+    hour_gz: str
+    dun_type: str
+    ju_number: int
+    palace: int         # 命中的宫位号
+    tianpan: str
+    star: str
+    door: str
+    god: str
+
+    @property
+    def shichen(self) -> str:
+        return SHICHEN_NAMES[hour_to_shichen_index(self.hour)]
+
+    @property
+    def palace_name(self) -> str:
+        return PALACE_NAMES[self.palace]
+
+    @property
+    def direction(self) -> str:
+        return PALACE_DIRECTIONS[self.palace]
+
+    def chart(self):
+        """该时辰的完整奇门盘"""
+        from qimen.yinpan_engine import calculate_qimen
+        return calculate_qimen(self.year, self.month, self.day, self.hour)
+
+
+def scan_hours(start: date, end: date, door: str = "", star: str = "", god: str = "",
+               tianpan: str = "", direction: str = "", predicate=None):
+    """逐时辰扫描 [start, end] 日期范围（含两端），惰性产出命中的 ScanHit
+
+    door/star/god/tianpan/direction: 宫内八门、九星、八神、天盘干、方位须全部满足（空串表示不限）
+    predicate: 可选的附加条件 predicate(plate, palace_num) -> bool，可用 plate.palace(palace_num) 取宫位
+    条件名称无效（如 "开" 而非 "开门"）时立即抛出 ValueError，列出可选名称。
+    """
+    # 条件换成盘面序号比较
+    criteria = []
+    for label, field_name, value, names in (
+        ("door", "doors", door, DOOR_NAMES), ("star", "stars", star, STAR_NAMES),
+        ("god", "gods", god, GOD_NAMES), ("tianpan", "tianpan", tianpan, STEM_NAMES),
+    ):
+        if value:
+            if value not in names:
+                raise ValueError(f"无效的 {label}: {value!r}，可选: {'、'.join(n for n in names if n)}")
+            criteria.append((field_name, names.index(value)))
+    if direction:
+        valid = list(dict.fromkeys(PALACE_DIRECTIONS[n] for n in range(1, 10)))
+        if direction not in valid:
+            raise ValueError(f"无效的 direction: {direction!r}，可选: {'、'.join(valid)}")
+    palaces = [n for n in range(1, 10) if not direction or PALACE_DIRECTIONS[n] == direction]
+    return _scan(start, end, criteria, palaces, predicate)
+
+
+def _scan(start: date, end: date, criteria: list, palaces: list, predicate):
+    """scan_hours 的扫描生成器（条件已校验）"""
+    cursor = JuCursor(start.year, start.month, start.day)
+    while cursor.ordinal <= end.toordinal():
+        current = cursor.date
+        y, m, d = current.year, current.month, current.day
+        dun_type, ju_number = cursor.dun_type, cursor.ju_number  # 局数在一天之内不变
+
+        for hour in SCAN_HOURS:
+            hour_gz = hour_ganzhi_index(cursor.day_gz, hour)
+            plate = get_plate(dun_type, ju_number, hour_gz)
+            for num in palaces:
+                if all(getattr(plate, f)[num] == v for f, v in criteria) and (
+                    predicate is None or predicate(plate, num)
+                ):
+                    yield ScanHit(
+                        year=y, month=m, day=d, hour=hour,
+                        hour_gz=JIAZI_60[hour_gz],
+                        dun_type=dun_type, ju_number=ju_number,
+                        palace=num,
+                        tianpan=STEM_NAMES[plate.tianpan[num]], star=STAR_NAMES[plate.stars[num]],
+                        door=DOOR_NAMES[plate.doors[num]], god=GOD_NAMES[plate.gods[num]],
+                    )
+        cursor.next_day()
@@ -1,166 +1,117 @@
 """奇门遁甲阴盘排盘核心引擎（转盘法）"""
 
-from shared.ganzhi import (
-    TIANGAN, DIZHI, JIAZI_60, find_xun_head,
-    hour_to_shichen_index,
-)
-from shared.calendar_utils import (
-    get_four_pillars_raw, get_lunar_date, get_hour_ganzhi,
-)
-from qimen.constants import (
-    SANQI_LIUYI, LUOSHU_ORDER, NINE_STARS, EIGHT_DOORS,
-    EIGHT_GODS, XUN_TO_LIUYI, PALACE_NAMES,
-)
+from operator import itemgetter
+from shared.ganzhi import TIANGAN_INDEX
+from shared.calendar_utils import get_day_context
+from qimen.constants import SANQI_LIUYI, NINE_STARS, EIGHT_DOORS
 from qimen.ju_calculator import calculate_ju
-from qimen.palace import Palace, QimenChart
+from qimen.palace import QimenChart, QimenPlate
 
 
 # 八宫环序（不含5宫，用于转盘旋转）
-RING_ORDER = [1, 8, 3, 4, 9, 2, 7, 6]
+RING_ORDER = (1, 8, 3, 4, 9, 2, 7, 6)
+# 宫位 → 环序索引（下标为宫位号，5寄2，下标0不用）
+RING_INDEX = (0, 0, 5, 2, 3, 5, 7, 6, 1, 4)
+
+# 转盘置换表: ROTATIONS[偏移][宫位] → 转前所在宫位（偏移 0-7，按环序顺转）
+# 5宫（中宫）与下标0不动；同一偏移对天盘、九星、八门、八神共用，一次置换完成转盘
+ROTATIONS = tuple(
+    tuple(
+        RING_ORDER[(RING_INDEX[p] - offset) % 8] if p not in (0, 5) else p
+        for p in range(10)
+    )
+    for offset in range(8)
+)
+_ROTATE = tuple(itemgetter(*perm) for perm in ROTATIONS)
+
+# 三奇六仪的天干序号（戊己庚辛壬癸丁丙乙）
+SANQI_LIUYI_IDX = tuple(TIANGAN_INDEX[e] for e in SANQI_LIUYI)
+
+# 原始九星、八门（序号，以宫位号为下标）：STAR_LIST / DOOR_LIST 按原始宫位排列，中宫无门
+BASE_STARS = (-1,) + tuple(p - 1 for p in NINE_STARS)
+BASE_DOORS = (-1,) + tuple(p - 1 if EIGHT_DOORS[p] else -1 for p in EIGHT_DOORS)
+
+# 八神起点表: BASE_GODS[阴阳遁][起始环序] → 以该环位起值符、按遁向排布的八神序号（以宫位号为下标）
+# 转盘前以值符宫为起点，随转盘置换后恰好从时干落宫起排
+BASE_GODS = {
+    dun: tuple(
+        tuple(
+            -1 if p in (0, 5) else (sign * (RING_INDEX[p] - start)) % 8
+            for p in range(10)
+        )
+        for start in range(8)
+    )
+    for dun, sign in (("阳", 1), ("阴", -1))
+}
 
 
-def _lay_dipan(dun_type: str, ju_number: int) -> dict:
+def _lay_dipan(dun_type: str, ju_number: int) -> tuple:
     """布地盘：按局数将三奇六仪放入九宫
     阳遁：从局数宫起，按宫序1→2→3→4→5→6→7→8→9顺排
     阴遁：从局数宫起，按宫序9→8→7→6→5→4→3→2→1逆排
-    返回: {宫位: 奇仪}
-    """
-    dipan = {}
-    if dun_type == "阳":
-        for i, element in enumerate(SANQI_LIUYI):
-            palace_num = (ju_number - 1 + i) % 9 + 1
-            dipan[palace_num] = element
-    else:  # 阴遁
-        for i, element in enumerate(SANQI_LIUYI):
-            palace_num = (ju_number - 1 - i) % 9 + 1
-            dipan[palace_num] = element
-    return dipan
-
-
-def _find_element_palace(dipan: dict, element: str) -> int:
-    """在地盘中找到某个奇仪所在的宫位"""
-    for palace, elem in dipan.items():
-        if elem == element:
-            return palace
-    return 0
-
-
-def _get_hour_element(hour_gz: str) -> str:
-    """获取时干对应的奇仪
-    如果时干是甲，使用旬首对应的六仪
-    否则直接使用时干（它本身就是奇仪之一）
+    返回: 奇仪天干序号元组（以宫位号为下标，下标0不用）
     """
-    hour_tg = hour_gz[0]
-    if hour_tg == "甲":
-        # 甲遁入六仪，找旬首对应六仪
-        xun_head = find_xun_head(hour_gz)
-        return XUN_TO_LIUYI.get(xun_head, "戊")
-    else:
-        return hour_tg
-
+    dipan = [-1] * 10
+    step = 1 if dun_type == "阳" else -1
+    for i, element in enumerate(SANQI_LIUYI_IDX):
+        dipan[(ju_number - 1 + step * i) % 9 + 1] = element
+    return tuple(dipan)
 
-def _ring_index(palace: int) -> int:
-    """获取宫位在八宫环中的索引"""
-    if palace == 5:
-        return RING_ORDER.index(2)  # 5寄2
-    return RING_ORDER.index(palace)
 
+# 地盘表: (阴阳遁, 局数) → 地盘，共 18 种
+DIPAN_TABLE = {(dun, ju): _lay_dipan(dun, ju) for dun in ("阳", "阴") for ju in range(1, 10)}
 
-def _rotate_ring(original: dict, from_palace: int, to_palace: int) -> dict:
-    """转盘旋转：将 from_palace 的内容转到 to_palace，其余跟着转
-    只旋转8个外宫，5宫（中宫）内容保持不变
-    """
-    if from_palace == 5:
-        from_palace = 2  # 5寄坤2
-    if to_palace == 5:
-        to_palace = 2
-
-    from_idx = RING_ORDER.index(from_palace)
-    to_idx = RING_ORDER.index(to_palace)
-    offset = (to_idx - from_idx) % 8
 
-    rotated = {}
-    for palace, content in original.items():
-        if palace == 5:
-            continue  # 5宫不参与转盘旋转
-        old_idx = RING_ORDER.index(palace)
-        new_idx = (old_idx + offset) % 8
-        new_palace = RING_ORDER[new_idx]
-        rotated[new_palace] = content
-
-    # 5宫内容保持不变
-    if 5 in original:
-        rotated[5] = original[5]
-
-    return rotated
-
-
-def _build_tianpan(dipan: dict, zhifu_palace: int, hour_element_palace: int) -> dict:
-    """构建天盘：值符所带奇仪转到时干落宫，其余跟转"""
-    # 构建原始天盘（等于地盘）
-    original = {p: e for p, e in dipan.items()}
-    return _rotate_ring(original, zhifu_palace, hour_element_palace)
-
-
-def _build_stars(zhifu_palace: int, hour_element_palace: int) -> dict:
-    """布九星：值符星转到时干落宫
-    原始九星: NINE_STARS = {1: "天蓬", 2: "天芮", ...}
-    """
-    original = {p: s for p, s in NINE_STARS.items()}
-    return _rotate_ring(original, zhifu_palace, hour_element_palace)
+def _find_element_palace(dipan: tuple, element: int) -> int:
+    """在地盘中找到某个奇仪所在的宫位"""
+    try:
+        return dipan.index(element, 1)
+    except ValueError:
+        return 0
 
 
-def _build_doors(zhifu_palace: int, hour_element_palace: int) -> dict:
-    """布八门：值使门转到时干落宫
-    原始八门: EIGHT_DOORS = {1: "休门", 2: "死门", ...}
-    值使门的原始宫位与值符相同
+def _xun_liuyi(gz_index: int) -> int:
+    """干支所在旬首对应六仪的天干序号
+    甲子→戊、甲戌→己、甲申→庚、甲午→辛、甲辰→壬、甲寅→癸
     """
-    original = {p: d for p, d in EIGHT_DOORS.items() if d}  # 排除5宫空门
-    return _rotate_ring(original, zhifu_palace, hour_element_palace)
+    return 4 + gz_index // 10
 
 
-def _build_gods(dun_type: str, zhifu_final_palace: int) -> dict:
-    """布八神：从值符最终宫位起排
-    阳遁顺排，阴遁逆排
+def _get_hour_element(hour_gz: int) -> int:
+    """获取时干对应的奇仪（天干序号）
+    如果时干是甲，使用旬首对应的六仪
+    否则直接使用时干（它本身就是奇仪之一）
     """
-    gods = {}
-    if zhifu_final_palace == 5:
-        start_palace = 2
+    hour_tg = hour_gz % 10
+    if hour_tg == 0:
+        # 甲遁入六仪，找旬首对应六仪
+        return _xun_liuyi(hour_gz)
     else:
-        start_palace = zhifu_final_palace
-    start_idx = RING_ORDER.index(start_palace)
+        return hour_tg
 
-    for i, god_name in enumerate(EIGHT_GODS):
-        if dun_type == "阳":
-            idx = (start_idx + i) % 8
-        else:
-            idx = (start_idx - i) % 8
-        palace = RING_ORDER[idx]
-        gods[palace] = god_name
 
-    return gods
+def _rotation_offset(from_palace: int, to_palace: int) -> int:
+    """转盘偏移：from_palace 的内容转到 to_palace 需顺环序移动的格数（5宫寄坤2）"""
+    return (RING_INDEX[to_palace] - RING_INDEX[from_palace]) % 8
 
 
-def calculate_qimen(year: int, month: int, day: int, hour: int) -> QimenChart:
-    """计算完整奇门遁甲阴盘
+# 盘面缓存: (阴阳遁, 局数, 时柱序号) → QimenPlate，至多 2 × 9 × 60 = 1080 种
+_plates = {}
 
-    参数:
-        year, month, day: 公历日期
-        hour: 0-23 小时
 
-    返回: QimenChart 完整奇门盘
-    """
-    # 1. 计算局数
-    ju_info = calculate_ju(year, month, day, hour)
-    dun_type = ju_info["dun_type"]
-    ju_number = ju_info["ju_number"]
+def get_plate(dun_type: str, ju_number: int, hour_gz: int) -> QimenPlate:
+    """获取盘面（按 阴阳遁 + 局数 + 时柱 记忆化，同一组合只排一次）"""
+    key = (dun_type, ju_number, hour_gz)
+    plate = _plates.get(key)
+    if plate is None:
+        plate = _plates[key] = _compute_plate(dun_type, ju_number, hour_gz)
+    return plate
 
-    # 2. 获取四柱干支
-    pillars = get_four_pillars_raw(year, month, day, hour)
-    hour_gz = pillars["hour"]
 
+def _compute_plate(dun_type: str, ju_number: int, hour_gz: int) -> QimenPlate:
+    """排盘面：地盘、天盘、九星、八门、八神及值符值使"""
     # 3. 布地盘
-    dipan = _lay_dipan(dun_type, ju_number)
+    dipan = DIPAN_TABLE[(dun_type, ju_number)]
 
     # 4. 确定时干对应奇仪及落宫
     hour_element = _get_hour_element(hour_gz)
@@ -170,8 +121,7 @@ def calculate_qimen(year: int, month: int, day: int, hour: int) -> QimenChart:
 
     # 5. 确定值符值使
     #    旬首六仪在地盘的宫位 = 值符宫
-    xun_head = find_xun_head(hour_gz)
-    xun_liuyi = XUN_TO_LIUYI.get(xun_head, "戊")
+    xun_liuyi = _xun_liuyi(hour_gz)
     zhifu_palace = _find_element_palace(dipan, xun_liuyi)
     if zhifu_palace == 0:
         zhifu_palace = 1
@@ -182,52 +132,64 @@ def calculate_qimen(year: int, month: int, day: int, hour: int) -> QimenChart:
     # 值使门 = 值符宫的原始八门
     zhishi_door = EIGHT_DOORS.get(zhifu_star_palace, "")
 
-    # 6. 布天盘
-    tianpan = _build_tianpan(dipan, zhifu_palace, hour_element_palace)
-
-    # 7. 布九星
-    stars = _build_stars(zhifu_palace, hour_element_palace)
-
-    # 8. 布八门
-    doors = _build_doors(zhifu_palace, hour_element_palace)
-
-    # 9. 布八神（从值符最终位置起）
-    zhifu_final = hour_element_palace if hour_element_palace != 5 else 2
-    gods = _build_gods(dun_type, zhifu_final)
-
-    # 10. 组装九宫
-    palaces = {}
-    for num in range(1, 10):
-        p = Palace(number=num)
-        p.dipan = dipan.get(num, "")
-        p.tianpan = tianpan.get(num, dipan.get(num, ""))
-        p.star = stars.get(num, NINE_STARS.get(num, ""))
-        p.door = doors.get(num, "")
-        p.god = gods.get(num, "")
-        p.is_zhifu = (num == hour_element_palace)
-        p.is_zhishi = (num == hour_element_palace)
-        palaces[num] = p
-
-    # 组装 QimenChart
-    lunar = get_lunar_date(year, month, day)
+    # 6-9. 转盘：值符所带奇仪、值符星、值使门转到时干落宫，八神从值符起排，
+    #      天盘、九星、八门、八神共用一次置换
+    rotate = _ROTATE[_rotation_offset(zhifu_palace, hour_element_palace)]
+    tianpan = rotate(dipan)
+    stars = rotate(BASE_STARS)
+    doors = rotate(BASE_DOORS)
+    gods = rotate(BASE_GODS[dun_type][RING_INDEX[zhifu_palace]])
+
+    return QimenPlate(
+        dun_type=dun_type,
+        ju_number=ju_number,
+        hour_gz=hour_gz,
+        dipan=dipan,
+        tianpan=tianpan,
+        stars=stars,
+        doors=doors,
+        gods=gods,
+        zhifu_star=zhifu_star,
+        zhishi_door=zhishi_door,
+        zhifu_palace=hour_element_palace,
+    )
+
+
+def calculate_qimen(year: int, month: int, day: int, hour: int, ctx=None) -> QimenChart:
+    """计算完整奇门遁甲阴盘
+
+    参数:
+        year, month, day: 公历日期
+        hour: 0-23 小时
+        ctx: 可选的 DayContext，已解析当日历法时传入以复用
+
+    返回: QimenChart 完整奇门盘
+    """
+    # 当日历法上下文，局数与四柱共用
+    if ctx is None:
+        ctx = get_day_context(year, month, day)
+
+    # 1. 计算局数
+    ju_info = calculate_ju(year, month, day, hour, ctx=ctx)
+    dun_type = ju_info["dun_type"]
+    ju_number = ju_info["ju_number"]
+
+    # 2. 获取时柱（六十甲子序号）
+    hour_gz = ctx.hour_gz(hour)
+
+    # 3-9. 查盘面（地盘、天盘、九星、八门、八神）
+    plate = get_plate(dun_type, ju_number, hour_gz)
+
+    # 10. 组装 QimenChart（九宫为盘面上的视图，不逐宫复制）
     chart = QimenChart(
         solar_year=year,
         solar_month=month,
         solar_day=day,
         solar_hour=hour,
-        year_gz=pillars["year"],
-        month_gz=pillars["month"],
-        day_gz=pillars["day"],
-        hour_gz=hour_gz,
-        jieqi_name=ju_info["jieqi_name"],
+        ganzhi=(ctx.year_gz, ctx.month_gz, ctx.day_gz, hour_gz),
+        jieqi_index=ju_info["jieqi_index"],
         yuan=ju_info["yuan"],
-        dun_type=dun_type,
-        ju_number=ju_number,
-        zhifu_star=zhifu_star,
-        zhishi_door=zhishi_door,
-        zhifu_palace=hour_element_palace,
-        zhishi_palace=hour_element_palace,
-        palaces=palaces,
+        plate=plate,
     )
 
     return chart
@@ -0,0 +1,218 @@
+"""AI 解读内容寻址缓存
+
+键为 (模型, 系统提示, 提示, 温度) 的 SHA-256，同一盘面生成的相同提示不再重复调用付费 API。
+两级：进程内 LRU（热门盘、当前时辰的奇门盘）+ SQLite（重启后仍有效）。
+
+- TTL：超过有效期的条目视为未命中（八字提示含当前年份，跨年自然换键）
+- 容量：内存按条数 LRU 淘汰；磁盘超限时删除最久未访问的条目
+- 失败提示（is_ai_error）一律不缓存
+- 磁盘层出错（路径不可写、磁盘满、文件损坏等）时记录日志，退化为仅内存缓存，不影响调用方
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = float(os.environ.get("AI_CACHE_TTL", str(30 * 86400)))  # 秒
+MEMORY_MAXSIZE = int(os.environ.get("AI_CACHE_MEMORY_SIZE", "256"))
+DISK_MAXSIZE = int(os.environ.get("AI_CACHE_DISK_SIZE", "20000"))
+DEFAULT_DB_PATH = os.environ.get(
+    "AI_CACHE_PATH",
+    str(Path(__file__).resolve().parent.parent / ".cache" / "ai_cache.sqlite3"),
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ai_cache (
+    key TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ai_cache_accessed ON ai_cache (accessed_at);
+"""
+
+
+def reading_key(model: str, system_prompt: str, prompt: str, temperature: float) -> str:
+    """请求内容 → 缓存键（SHA-256 十六进制）"""
+    raw = json.dumps([model, system_prompt, prompt, round(float(temperature), 4)],
+                     ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ReadingCache:
+    """两级 AI 解读缓存；path=None 时只用内存"""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, ttl: float = DEFAULT_TTL,
+                 memory_maxsize: int = MEMORY_MAXSIZE, disk_maxsize: int = DISK_MAXSIZE):
+        self.path = path
+        self.ttl = ttl
+        self.memory_maxsize = memory_maxsize
+        self.disk_maxsize = disk_maxsize
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_errors = 0
+        self._memory = OrderedDict()  # key → (created_at, text)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._puts = 0
+
+    # ---------- 磁盘 ----------
+    def _conn(self):
+        if self.path is None:
+            return None
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.path != ":memory:":
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _disk_get(self, key: str, now: float):
+        conn = self._conn()
+        if conn is None:
+            return None
+        row = conn.execute("SELECT text, created_at FROM ai_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        text, created_at = row
+        with conn:
+            if now - created_at > self.ttl:
+                conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE ai_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return created_at, text
+
+    def _disk_put(self, key: str, text: str, now: float):
+        conn = self._conn()
+        if conn is None:
+            return
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO ai_cache VALUES (?, ?, ?, ?)", (key, text, now, now))
+            self._puts += 1
+            if self._puts % 64 == 0:  # 摊销：每 64 次写入清理一次
+                self._disk_evict(conn, now)
+
+    def _disk_failed(self, action: str, error: Exception):
+        with self._lock:
+            self.disk_errors += 1
+        logger.warning("AI 解读缓存%s失败（%s），仅用内存缓存: %s", action, self.path, error)
+
+    def _disk_evict(self, conn, now: float):
+        """删除过期条目，并把条数压到 disk_maxsize 以内（先删最久未访问的）"""
+        conn.execute("DELETE FROM ai_cache WHERE created_at < ?", (now - self.ttl,))
+        conn.execute(
+            "DELETE FROM ai_cache WHERE key IN (SELECT key FROM ai_cache "
+            "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_maxsize,),
+        )
+
+    # ---------- 读写 ----------
+    def get(self, key: str):
+        """命中返回解读文本，否则返回 None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+        try:
+            entry = self._disk_get(key, now)
+        except (sqlite3.Error, OSError) as e:
+            self._disk_failed("读取", e)
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._memory_put(key, entry)
+        return entry[1]
+
+    def put(self, key: str, text: str) -> bool:
+        """写入解读；空串与失败提示不缓存，返回是否已写入"""
+        from shared.ai_client import is_ai_error
+        if not text or is_ai_error(text):
+            return False
+        now = time.time()
+        with self._lock:
+            self._memory_put(key, (now, text))
+        try:
+            self._disk_put(key, text, now)
+        except (sqlite3.Error, OSError) as e:
+            self._disk_failed("写入", e)
+        return True
+
+    def _memory_put(self, key: str, entry: tuple):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_maxsize:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    # ---------- 维护 ----------
+    def clear(self):
+        """清空两级缓存并重置计数"""
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.disk_hits = self.misses = self.evictions = self.disk_errors = 0
+        try:
+            conn = self._conn()
+            if conn is not None:
+                with conn:
+                    conn.execute("DELETE FROM ai_cache")
+        except (sqlite3.Error, OSError) as e:
+            self._disk_failed("清空", e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_errors": self.disk_errors,
+                "memory_size": len(self._memory),
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+        try:
+            conn = self._conn()
+            if conn is not None:
+                stats["disk_size"] = conn.execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0]
+        except (sqlite3.Error, OSError) as e:
+            self._disk_failed("统计", e)
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_reading_cache() -> ReadingCache:
+    """进程内共享的默认 ReadingCache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ReadingCache()
+    return _cache
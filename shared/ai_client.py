@@ -2,8 +2,17 @@
 
 import os
 import json
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
 import requests
+from requests.adapters import HTTPAdapter
 from pathlib import Path
+from shared.ai_cache import get_reading_cache, reading_key
 
 # 优先从 Streamlit secrets 读取（云端部署），其次从 .env 文件读取（本地开发）
 try:
@@ -29,14 +38,281 @@ if not API_KEY:
     MODEL = os.environ.get("TONGYI_MODEL", "qwen-plus")
 API_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions"
 
+# 连接池与超时（秒），可用环境变量覆盖
+POOL_SIZE = int(os.environ.get("TONGYI_POOL_SIZE", "16"))
+CONNECT_TIMEOUT = float(os.environ.get("TONGYI_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("TONGYI_READ_TIMEOUT", "60"))
 
-def call_tongyi(prompt: str, system_prompt: str = "", temperature: float = 0.8) -> str:
-    """调用通义千问 API
-    返回: AI 生成的文本，失败时返回错误提示
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """进程内共享的 keep-alive 会话
+
+    连接由 urllib3 连接池管理，可在 Streamlit 各会话线程间共用，
+    重复调用（含重试）复用已建立的 TCP/TLS 连接。请求头随每次请求传入，不改动会话状态。
     """
-    if not API_KEY:
-        return "[API Key 未配置，无法生成AI解读。请在 .env 文件中设置 TONGYI_API_KEY]"
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+_executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """acall_tongyi 使用的线程池，大小与连接池一致"""
+    global _executor
+    if _executor is None:
+        with _session_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="tongyi")
+    return _executor
+
+
+def close_session():
+    """关闭共享会话（下次调用时重建）"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+# ============ 流量控制 ============
+# 全进程共用：令牌桶限速 + 并发上限 + 指数退避重试，可用环境变量覆盖
+RATE_LIMIT = float(os.environ.get("TONGYI_RATE_LIMIT", "2"))      # 平均每秒请求数，<=0 不限速
+RATE_BURST = int(os.environ.get("TONGYI_RATE_BURST", "5"))        # 允许的突发请求数
+MAX_CONCURRENCY = int(os.environ.get("TONGYI_MAX_CONCURRENCY", "4"))
+QUEUE_TIMEOUT = float(os.environ.get("TONGYI_QUEUE_TIMEOUT", "30"))  # 等待并发名额的上限（秒），超时即返回失败提示
+MAX_ATTEMPTS = int(os.environ.get("TONGYI_MAX_ATTEMPTS", "3"))
+BACKOFF_BASE = float(os.environ.get("TONGYI_BACKOFF_BASE", "1"))  # 首次重试前最长等待（秒）
+BACKOFF_MAX = float(os.environ.get("TONGYI_BACKOFF_MAX", "30"))   # 单次等待上限；Retry-After 超过则不再重试
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """线程安全的令牌桶：平均每秒 rate 个，最多积攒 capacity 个
+
+    令牌不足时先预支（余额可为负）再在锁外等待，等待者按到达顺序依次放行。
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """取一个令牌，不足时阻塞等待；返回等待秒数"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+class _Metrics:
+    """调用统计（计数器加锁更新）"""
+
+    _COUNTERS = ("requests", "upstream_calls", "coalesced", "retries", "throttled", "failures",
+                 "queue_timeouts", "queue_depth", "in_flight")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._values = dict.fromkeys(self._COUNTERS, 0)
+            self._wait_total = 0.0
+            self._wait_max = 0.0
+            self._waits = 0
+
+    def add(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self._values[name] += delta
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self._waits += 1
+            self._wait_total += seconds
+            self._wait_max = max(self._wait_max, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self._values)
+            stats["wait_total"] = self._wait_total
+            stats["wait_max"] = self._wait_max
+            stats["wait_avg"] = self._wait_total / self._waits if self._waits else 0.0
+            return stats
+
+
+_bucket = TokenBucket(RATE_LIMIT, RATE_BURST)
+_concurrency = threading.BoundedSemaphore(MAX_CONCURRENCY)
+_metrics = _Metrics()
+
+
+def get_ai_metrics() -> dict:
+    """调用统计
+
+    requests: 调用次数（含缓存命中）；upstream_calls: 实际发出的请求（含重试）；
+    coalesced: 合并到进行中相同请求的次数；retries / throttled(429) / failures: 重试、限流、最终失败次数；
+    queue_timeouts: 等待并发名额超过 QUEUE_TIMEOUT 而放弃的次数；
+    queue_depth / in_flight: 当前排队等待、正在请求的数量；wait_*: 排队等待时间（秒）
+    """
+    return _metrics.snapshot()
+
+
+class QueueTimeout(Exception):
+    """等待上游并发名额超时（流式请求会占用名额直到输出结束）"""
+
+
+@contextmanager
+def _upstream_slot():
+    """占用一个上游并发名额并取得限速令牌，期间发出一次请求；等待名额超过 QUEUE_TIMEOUT 抛出 QueueTimeout"""
+    start = time.monotonic()
+    _metrics.add(queue_depth=1)
+    try:
+        if not _concurrency.acquire(timeout=QUEUE_TIMEOUT):
+            _metrics.add(queue_timeouts=1)
+            raise QueueTimeout(f"等待 {QUEUE_TIMEOUT:g} 秒仍无空闲名额")
+        try:
+            _bucket.acquire()
+        except BaseException:
+            _concurrency.release()
+            raise
+    finally:
+        _metrics.add(queue_depth=-1)
+    _metrics.record_wait(time.monotonic() - start)
+    _metrics.add(in_flight=1, upstream_calls=1)
+    try:
+        yield
+    finally:
+        _metrics.add(in_flight=-1)
+        _concurrency.release()
+
+
+def _parse_retry_after(value):
+    """Retry-After 头（秒数或 HTTP 日期）→ 秒数，无法解析返回 None"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_delay(attempt: int, resp=None):
+    """第 attempt 次（从 0 起）失败后重试前的等待秒数，不再重试时返回 None
+
+    服务端给出 Retry-After 时照办（超过 BACKOFF_MAX 则放弃），否则指数退避并加全抖动。
+    """
+    if attempt + 1 >= MAX_ATTEMPTS:
+        return None
+    retry_after = _parse_retry_after(resp.headers.get("Retry-After")) if resp is not None else None
+    if retry_after is not None:
+        return retry_after if retry_after <= BACKOFF_MAX else None
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def _classify_error(exc: Exception, resp=None):
+    """请求异常 → (错误提示, 是否可重试)"""
+    if isinstance(exc, QueueTimeout):
+        return "[AI解读生成失败（请求繁忙），请稍后重试]", False
+    if isinstance(exc, requests.exceptions.Timeout):
+        return "[AI解读生成失败（超时），请稍后重试]", True
+    if isinstance(exc, requests.exceptions.HTTPError) and resp is not None:
+        if resp.status_code == 429:
+            _metrics.add(throttled=1)
+        return f"[AI解读生成失败: {exc}]", resp.status_code in RETRY_STATUS
+    if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError)):
+        return f"[AI解读生成失败: {exc}]", True
+    return f"[AI解读生成失败: {exc}]", False
+
 
+class _Flight:
+    __slots__ = ("done", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class SingleFlight:
+    """相同键的并发请求合并为一次：首个调用者发起请求，其余等待并共享其结果"""
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def join(self, key: str):
+        """返回 (flight, 是否由本调用者发起)"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                _metrics.add(coalesced=1)
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def finish(self, key: str, flight: _Flight, result: str):
+        flight.result = result
+        with self._lock:
+            self._flights.pop(key, None)
+        flight.done.set()
+
+    def do(self, key: str, fn) -> str:
+        flight, leader = self.join(key)
+        if not leader:
+            flight.done.wait()
+            return flight.result
+        result = None
+        try:
+            result = fn()
+            return result
+        finally:
+            self.finish(key, flight, result if result is not None else FAILED_MESSAGE)
+
+
+_single_flight = SingleFlight()
+
+
+# call_tongyi 失败时返回的提示文字前缀（不应缓存或持久化）
+AI_ERROR_PREFIXES = ("[AI解读生成失败", "[API Key 未配置")
+NO_API_KEY_MESSAGE = "[API Key 未配置，无法生成AI解读。请在 .env 文件中设置 TONGYI_API_KEY]"
+FAILED_MESSAGE = "[AI解读生成失败，请稍后重试]"
+# 流式输出中途断开时追加在已输出内容之后
+STREAM_INTERRUPTED_SUFFIX = "\n\n[AI解读生成失败（连接中断），以上内容不完整]"
+
+
+def is_ai_error(text: str) -> bool:
+    """是否为 call_tongyi 返回的失败提示，或中途断开的不完整流式输出"""
+    return text.startswith(AI_ERROR_PREFIXES) or text.endswith(STREAM_INTERRUPTED_SUFFIX)
+
+
+def _build_request(prompt: str, system_prompt: str, temperature: float, stream: bool = False):
+    """构造请求头与请求体"""
     messages = []
     if system_prompt:
         messages.append({"role": "system", "content": system_prompt})
@@ -51,23 +327,172 @@ def call_tongyi(prompt: str, system_prompt: str = "", temperature: float = 0.8)
         "messages": messages,
         "temperature": temperature,
     }
+    if stream:
+        payload["stream"] = True
+    return headers, payload
+
+
+def call_tongyi(prompt: str, system_prompt: str = "", temperature: float = 0.8,
+                use_cache: bool = True) -> str:
+    """调用通义千问 API
+    use_cache: 先查 AI 解读缓存（shared.ai_cache），成功结果写回缓存
+    同时进行的相同请求只发出一次（single-flight），上游请求受全局限速与并发上限约束。
+    返回: AI 生成的文本，失败时返回错误提示
+    """
+    _metrics.add(requests=1)
+    key = reading_key(MODEL, system_prompt, prompt, temperature)
+    cache = get_reading_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    def fetch():
+        result = _post_tongyi(prompt, system_prompt, temperature)
+        if cache is not None:
+            cache.put(key, result)  # 失败提示不会写入
+        return result
+
+    return _single_flight.do(key, fetch)
+
 
-    for attempt in range(2):
+def _post_tongyi(prompt: str, system_prompt: str, temperature: float) -> str:
+    """实际发起请求（不经缓存）；超时、连接错误、429 与 5xx 按退避策略重试"""
+    if not API_KEY:
+        return NO_API_KEY_MESSAGE
+
+    headers, payload = _build_request(prompt, system_prompt, temperature)
+
+    for attempt in range(MAX_ATTEMPTS):
+        resp = None
         try:
-            resp = requests.post(API_URL, headers=headers, json=payload, timeout=60)
-            resp.encoding = "utf-8"
-            resp.raise_for_status()
-            data = resp.json()
+            with _upstream_slot():
+                resp = get_session().post(
+                    API_URL, headers=headers, json=payload,
+                    timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                )
+                resp.encoding = "utf-8"
+                resp.raise_for_status()
+                data = resp.json()
             content = data["choices"][0]["message"]["content"]
             if not isinstance(content, str):
                 content = str(content)
             return content
-        except requests.exceptions.Timeout:
-            if attempt == 0:
-                continue
-            return "[AI解读生成失败（超时），请稍后重试]"
         except Exception as e:
-            if attempt == 0:
-                continue
-            return f"[AI解读生成失败: {e}]"
-    return "[AI解读生成失败，请稍后重试]"
+            message, retryable = _classify_error(e, resp)
+        delay = _retry_delay(attempt, resp) if retryable else None
+        if delay is None:
+            _metrics.add(failures=1)
+            return message
+        _metrics.add(retries=1)
+        time.sleep(delay)
+    return FAILED_MESSAGE
+
+
+async def acall_tongyi(prompt: str, system_prompt: str = "", temperature: float = 0.8,
+                       use_cache: bool = True) -> str:
+    """call_tongyi 的 asyncio 版本，可用 asyncio.gather 并发发起多个请求
+
+    在专用线程池中执行 call_tongyi，与同步调用共用同一个 keep-alive 连接池；
+    返回值与失败提示同 call_tongyi。
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), call_tongyi, prompt, system_prompt, temperature, use_cache,
+    )
+
+
+def _iter_sse_content(resp):
+    """逐条解析 SSE 响应（OpenAI 兼容格式），产出增量文本
+
+    chunk_size=None：分块传输时每收到一块即处理，不攒满缓冲区。未收到 [DONE] 即结束视为连接中断。
+    """
+    for line in resp.iter_lines(chunk_size=None):
+        if not line.startswith(b"data:"):
+            continue  # 空行、注释（": keep-alive"）等
+        data = line[5:].strip()
+        if data == b"[DONE]":
+            return
+        chunk = json.loads(data.decode("utf-8"))
+        choices = chunk.get("choices") or []
+        if not choices:
+            continue
+        content = (choices[0].get("delta") or {}).get("content")
+        if content:
+            yield content if isinstance(content, str) else str(content)
+    raise requests.exceptions.ChunkedEncodingError("流式响应未正常结束")
+
+
+def stream_tongyi(prompt: str, system_prompt: str = "", temperature: float = 0.8,
+                  use_cache: bool = True):
+    """流式调用通义千问 API（stream: true），逐段产出文本，可直接交给 st.write_stream
+
+    尚未收到任何内容时失败按退避策略重试，仍失败则产出与 call_tongyi 相同的错误提示；
+    已输出部分内容后断开则追加 STREAM_INTERRUPTED_SUFFIX（拼接结果可用 is_ai_error 识别）。
+    use_cache: 缓存命中时一次产出全文；完整生成的结果写回缓存（与 call_tongyi 共用）
+    已有相同请求进行中时不再发起，等其完成后一次产出全文。
+    """
+    _metrics.add(requests=1)
+    key = reading_key(MODEL, system_prompt, prompt, temperature)
+    cache = get_reading_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    flight, leader = _single_flight.join(key)
+    if not leader:
+        flight.done.wait()
+        yield flight.result
+        return
+
+    result = None
+    try:
+        parts = []
+        for content in _stream_tongyi(prompt, system_prompt, temperature):
+            parts.append(content)
+            yield content
+        result = "".join(parts)
+        if cache is not None:
+            cache.put(key, result)  # 中途断开或失败的结果不会写入
+    finally:
+        _single_flight.finish(key, flight, result if result is not None else FAILED_MESSAGE)
+
+
+def _stream_tongyi(prompt: str, system_prompt: str, temperature: float):
+    """实际发起流式请求（不经缓存）"""
+    if not API_KEY:
+        yield NO_API_KEY_MESSAGE
+        return
+
+    headers, payload = _build_request(prompt, system_prompt, temperature, stream=True)
+
+    for attempt in range(MAX_ATTEMPTS):
+        received = False
+        resp = None
+        try:
+            with _upstream_slot():
+                with get_session().post(
+                    API_URL, headers=headers, json=payload, stream=True,
+                    timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                ) as resp:
+                    resp.raise_for_status()
+                    for content in _iter_sse_content(resp):
+                        received = True
+                        yield content
+            return
+        except Exception as e:
+            if received:
+                _metrics.add(failures=1)
+                yield STREAM_INTERRUPTED_SUFFIX
+                return
+            message, retryable = _classify_error(e, resp)
+        delay = _retry_delay(attempt, resp) if retryable else None
+        if delay is None:
+            _metrics.add(failures=1)
+            yield message
+            return
+        _metrics.add(retries=1)
+        time.sleep(delay)
+    yield FAILED_MESSAGE
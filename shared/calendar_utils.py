@@ -1,7 +1,17 @@
 """sxtwl 日历引擎封装 - 提供公历转农历、节气查询、干支转换"""
 
 import sxtwl
-from shared.ganzhi import TIANGAN, DIZHI, get_ganzhi_str, hour_to_shichen_index
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import date
+from shared.ganzhi import (
+    TIANGAN, DIZHI, JIAZI_60, JIAZI_INDEX, ganzhi_index,
+    hour_to_shichen_index, solar_to_jdn, day_ganzhi_index,
+    hour_ganzhi_index, year_ganzhi_index, month_ganzhi_index,
+)
 
 # sxtwl 节气索引 → 名称（从冬至=0开始）
 JIEQI_NAMES = [
@@ -58,66 +68,430 @@ def jd_to_datetime(jd: float):
     return year, month, day, hour, minute
 
 
+# ============ 节气索引表 ============
+# 一次性预计算 1900–2100 年（UI 允许范围）的全部节气，按儒略日排序，查询用二分。
+# sxtwl.getJieQiByYear(y) 返回 y 年立春至 y+1 年立春，故从 1899 年起算以覆盖 1900 年 1 月。
+JIEQI_TABLE_START_YEAR = 1899
+JIEQI_TABLE_END_YEAR = 2100
+
+
+@dataclass
+class JieqiTable:
+    """节气索引表
+
+    条目格式: (年, 月, 日, 时, 分, 儒略日, 节气索引)，按儒略日排序，可直接按 (年, 月) 二分。
+    *_days 为对应条目的公历日序数(date.toordinal)，供按日期二分。
+    """
+    days: list          # 全部24节气的日序数
+    entries: list       # 全部24节气条目
+    jie_days: list      # 12个"节"的日序数
+    jie_entries: list   # 12个"节"的条目
+    jie_jds: list       # 12个"节"的交节时刻（儒略日，北京时间），供按时刻二分
+    month_days: list    # 与 jie_entries 对应的换月日序数（与 sxtwl 月柱换月日一致）
+    month_ganzhi: list  # 与 jie_entries 对应的 (年柱, 月柱) 六十甲子序号
+
+
+_jieqi_table = None
+
+
+def _month_branch(ordinal: int) -> int:
+    """sxtwl 给出的某日月支"""
+    d = date.fromordinal(ordinal)
+    return get_day(d.year, d.month, d.day).getMonthGZ().dz
+
+
+def _build_jieqi_table() -> JieqiTable:
+    """构建节气索引表"""
+    seen = set()
+    entries = []
+    for y in range(JIEQI_TABLE_START_YEAR, JIEQI_TABLE_END_YEAR + 1):
+        for jq in sxtwl.getJieQiByYear(y):
+            if jq.jd in seen:  # 相邻两年首尾的立春重复
+                continue
+            seen.add(jq.jd)
+            entries.append(jd_to_datetime(jq.jd) + (jq.jd, jq.jqIndex))
+    entries.sort(key=lambda e: e[5])
+
+    days = [date(e[0], e[1], e[2]).toordinal() for e in entries]
+    jie_entries = [e for e in entries if e[6] in JIE_INDICES]
+    jie_days = [date(e[0], e[1], e[2]).toordinal() for e in jie_entries]
+
+    # 换月日一般就是交节日；节在子夜前后时 sxtwl 月柱可能提前/推后一天换月，以 sxtwl 为准
+    month_days = []
+    for e, day_ord in zip(jie_entries, jie_days):
+        minutes = e[3] * 60 + e[4]
+        if 15 < minutes < 24 * 60 - 15:  # 远离子夜，无需向 sxtwl 核对（getMonthGZ 较慢）
+            month_days.append(day_ord)
+            continue
+        branch = (JIE_TO_MONTH[e[6]] + 1) % 12
+        while _month_branch(day_ord - 1) == branch:
+            day_ord -= 1
+        while _month_branch(day_ord) != branch:
+            day_ord += 1
+        month_days.append(day_ord)
+
+    # 每个节令月的年柱、月柱（立春定年、节定月；小寒起丑月，仍属上一个立春年）
+    month_ganzhi = []
+    for e in jie_entries:
+        month_num = JIE_TO_MONTH[e[6]]
+        year_gz = year_ganzhi_index(e[0] - 1 if month_num == 12 else e[0])
+        month_ganzhi.append((year_gz, month_ganzhi_index(year_gz, month_num)))
+
+    jie_jds = [e[5] for e in jie_entries]
+    return JieqiTable(days, entries, jie_days, jie_entries, jie_jds, month_days, month_ganzhi)
+
+
+def get_jieqi_table() -> JieqiTable:
+    """获取节气索引表（首次调用时构建）"""
+    global _jieqi_table
+    if _jieqi_table is None:
+        _jieqi_table = _build_jieqi_table()
+    return _jieqi_table
+
+
+def _jieqi_entry_to_dict(entry) -> dict:
+    """节气条目 → 对外字典格式"""
+    y, mo, da, h, mi, _, jq_idx = entry
+    return {
+        "index": jq_idx,
+        "name": JIEQI_NAMES[jq_idx],
+        "date": date(y, mo, da),
+        "year": y, "month": mo, "day": da,
+        "hour": h, "minute": mi,
+    }
+
+
+# ============ 日历查询缓存 ============
+class LRUCache:
+    """线程安全的有界 LRU 缓存，带命中/未命中/淘汰计数
+
+    Streamlit 多个会话线程共享同一进程，故读写加锁；计算在锁外进行，
+    并发未命中同一键时最多重复计算一次，结果一致。
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """命中则返回缓存值，否则调用 compute() 计算并写入"""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+        return value
+
+    def resize(self, maxsize: int):
+        """调整容量（缩小时立即淘汰最久未用的条目）"""
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        """清空缓存并重置计数"""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _evict(self):
+        while len(self._data) > max(self.maxsize, 0):
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+
+# 日级缓存键 (年, 月, 日) → DayContext
+# 时级缓存键 (年, 月, 日, 时辰序号) → 四柱；时辰序号 = (hour + 1) // 2，
+# 0 为早子时(0点)、12 为晚子时(23点)，两者时柱不同故分开缓存
+_day_cache = LRUCache(maxsize=4096)
+_hour_cache = LRUCache(maxsize=16384)
+
+
+def configure_calendar_cache(day_maxsize: int = None, hour_maxsize: int = None):
+    """设置日历缓存容量"""
+    if day_maxsize is not None:
+        _day_cache.resize(day_maxsize)
+    if hour_maxsize is not None:
+        _hour_cache.resize(hour_maxsize)
+
+
+def calendar_cache_stats() -> dict:
+    """日历缓存统计: {"day": {...}, "hour": {...}}"""
+    return {"day": _day_cache.stats(), "hour": _hour_cache.stats()}
+
+
+def clear_calendar_cache():
+    """清空进程内全部日历缓存"""
+    _day_cache.clear()
+    _hour_cache.clear()
+
+
 def get_day(year: int, month: int, day: int):
     """获取 sxtwl Day 对象"""
     return sxtwl.fromSolar(year, month, day)
 
 
+def _year_month_ganzhi(year: int, month: int, day: int):
+    """按节气表（立春定年、节定月）计算年柱、月柱序号
+    超出节气表范围时返回 None
+    """
+    table = get_jieqi_table()
+    pos = bisect_right(table.month_days, date(year, month, day).toordinal())
+    if pos == 0 or pos == len(table.month_days):
+        return None
+    return table.month_ganzhi[pos - 1]
+
+
 def get_year_ganzhi(year: int, month: int, day: int) -> str:
     """获取年干支（考虑立春分界）"""
-    d = get_day(year, month, day)
-    gz = d.getYearGZ()
-    return get_ganzhi_str(gz.tg, gz.dz)
+    return JIAZI_60[get_day_context(year, month, day).year_gz]
 
 
 def get_month_ganzhi(year: int, month: int, day: int) -> str:
-    """获取月干支（节气定月 + sxtwl直接提供）"""
-    d = get_day(year, month, day)
-    gz = d.getMonthGZ()
-    return get_ganzhi_str(gz.tg, gz.dz)
+    """获取月干支（节气定月）"""
+    return JIAZI_60[get_day_context(year, month, day).month_gz]
 
 
 def get_day_ganzhi(year: int, month: int, day: int) -> str:
-    """获取日干支"""
-    d = get_day(year, month, day)
-    gz = d.getDayGZ()
-    return get_ganzhi_str(gz.tg, gz.dz)
+    """获取日干支（儒略日数直接推算）"""
+    return JIAZI_60[day_ganzhi_index(solar_to_jdn(year, month, day))]
 
 
 def get_hour_ganzhi(year: int, month: int, day: int, hour: int) -> str:
-    """获取时干支（sxtwl直接提供，hour为0-23小时）"""
-    d = get_day(year, month, day)
-    gz = d.getHourGZ(hour)
-    return get_ganzhi_str(gz.tg, gz.dz)
+    """获取时干支（五鼠遁推算，hour为0-23小时）"""
+    day_gz = day_ganzhi_index(solar_to_jdn(year, month, day))
+    return JIAZI_60[hour_ganzhi_index(day_gz, hour)]
+
+
+# 农历日中文
+LUNAR_DAY_NAMES = [
+    "", "初一", "初二", "初三", "初四", "初五", "初六", "初七", "初八", "初九", "初十",
+    "十一", "十二", "十三", "十四", "十五", "十六", "十七", "十八", "十九", "二十",
+    "廿一", "廿二", "廿三", "廿四", "廿五", "廿六", "廿七", "廿八", "廿九", "三十",
+]
+LUNAR_MONTH_NAMES = [
+    "", "正月", "二月", "三月", "四月", "五月", "六月",
+    "七月", "八月", "九月", "十月", "冬月", "腊月",
+]
+
+
+# ============ 不可变记录 ============
+class _Record(Mapping):
+    """带 __slots__ 的只读记录，同时支持属性访问与字典式读取（record["name"] / .get / dict(record)）
+
+    不可变，可在日历缓存与排盘结果之间直接共享而无需复制。
+    """
+    __slots__ = ()
+    _KEYS = ()  # 字典式读取时暴露的键
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} 只读")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} 只读")
+
+    def _keys(self) -> tuple:
+        return self._KEYS
+
+    def __getitem__(self, key):
+        if key in self._keys():
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def __reduce__(self):
+        return type(self), tuple(getattr(self, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)})"
+
+
+class LunarDate(_Record):
+    """农历日期（排八字时附带时辰名 shichen）"""
+    __slots__ = ("year", "month", "day", "is_leap", "shichen")
+    _KEYS = ("year", "month", "day", "is_leap", "month_name", "day_name")
+
+    def __init__(self, year: int, month: int, day: int, is_leap: bool, shichen: str = ""):
+        super().__init__(year, month, day, is_leap, shichen)
+
+    def _keys(self) -> tuple:
+        return self._KEYS + ("shichen",) if self.shichen else self._KEYS
+
+    @property
+    def month_name(self) -> str:
+        return ("闰" if self.is_leap else "") + LUNAR_MONTH_NAMES[self.month]
+
+    @property
+    def day_name(self) -> str:
+        return LUNAR_DAY_NAMES[self.day]
+
+    def with_shichen(self, shichen: str) -> "LunarDate":
+        return LunarDate(self.year, self.month, self.day, self.is_leap, shichen)
+
+
+class JieqiInfo(_Record):
+    """当前所属节气：交节时刻与距交节天数；index 为 -1 表示超出节气表范围（空记录）"""
+    __slots__ = ("index", "year", "month", "day", "hour", "minute", "days_since")
+    _KEYS = ("index", "name", "date", "year", "month", "day", "hour", "minute", "days_since")
+
+    def _keys(self) -> tuple:
+        return self._KEYS if self.index >= 0 else ()
+
+    @property
+    def name(self) -> str:
+        return JIEQI_NAMES[self.index] if self.index >= 0 else ""
+
+    @property
+    def date(self):
+        return date(self.year, self.month, self.day) if self.index >= 0 else None
+
+
+EMPTY_JIEQI = JieqiInfo(-1, 0, 0, 0, 0, 0, 0)
+
+
+def _lunar_info(lunar_y: int, lunar_m: int, lunar_d: int, is_leap: bool) -> LunarDate:
+    """农历字段 → LunarDate 记录"""
+    return LunarDate(lunar_y, lunar_m, lunar_d, is_leap)
+
+
+# ============ 农历月表 ============
+# sxtwl 每次 fromSolar 新日期都要重算农历（十余毫秒），沿 Day.after(1) 逐日推进则几乎无开销。
+# 故按公历年推出一次该年各农历月的起始日，之后任意日期的农历只需二分查表。
+# 只缓存节气表范围内的年份，内存有界。
+_lunar_years = {}  # 公历年 → (各月首日序数列表, [(农历年, 农历月, 是否闰月), ...])
+
+
+def _build_lunar_year(year: int):
+    """逐日推进 sxtwl Day，收集公历 year 年内涉及的各农历月"""
+    starts, months = [], []
+    d = get_day(year, 1, 1)
+    for ordinal in range(date(year, 1, 1).toordinal(), date(year + 1, 1, 1).toordinal()):
+        lunar_d = d.getLunarDay()
+        if lunar_d == 1 or not starts:
+            starts.append(ordinal - lunar_d + 1)
+            months.append((d.getLunarYear(), d.getLunarMonth(), d.isLunarLeap()))
+        d = d.after(1)
+    return starts, months
+
+
+def _lunar_fields(year: int, month: int, day: int):
+    """公历 → (农历年, 农历月, 农历日, 是否闰月)"""
+    if not JIEQI_TABLE_START_YEAR <= year <= JIEQI_TABLE_END_YEAR:
+        d = get_day(year, month, day)
+        return d.getLunarYear(), d.getLunarMonth(), d.getLunarDay(), d.isLunarLeap()
+
+    table = _lunar_years.get(year)
+    if table is None:
+        table = _lunar_years[year] = _build_lunar_year(year)
+    starts, months = table
+    ordinal = date(year, month, day).toordinal()
+    pos = bisect_right(starts, ordinal) - 1
+    lunar_y, lunar_m, is_leap = months[pos]
+    return lunar_y, lunar_m, ordinal - starts[pos] + 1, is_leap
+
+
+@dataclass(frozen=True)
+class DayContext:
+    """单日历法上下文：一天的干支、农历、节气信息
+
+    八字、奇门排盘共用同一个上下文，避免同一天反复查询。
+    干支由算术与节气表推出，农历查农历月表。
+    """
+    year: int
+    month: int
+    day: int
+    year_gz: int    # 年柱六十甲子序号 0-59
+    month_gz: int   # 月柱六十甲子序号
+    day_gz: int     # 日柱六十甲子序号
+    lunar: LunarDate  # 农历信息（字段同 get_lunar_date）
+    jieqi: JieqiInfo  # 当前所属节气（字段同 find_current_jieqi）
+
+    def hour_gz(self, hour: int) -> int:
+        """时柱六十甲子序号（hour为0-23小时）"""
+        return hour_ganzhi_index(self.day_gz, hour)
+
+    def four_pillars(self, hour: int) -> dict:
+        """四柱干支字符串，格式同 get_four_pillars_raw"""
+        return {
+            "year": JIAZI_60[self.year_gz],
+            "month": JIAZI_60[self.month_gz],
+            "day": JIAZI_60[self.day_gz],
+            "hour": JIAZI_60[self.hour_gz(hour)],
+        }
+
+
+def get_day_context(year: int, month: int, day: int) -> DayContext:
+    """获取一天的历法上下文（经日级 LRU 缓存）
+
+    返回的上下文在缓存中共享，其中的 lunar / jieqi 为不可变记录，可直接引用。
+    """
+    return _day_cache.get_or_compute(
+        (year, month, day), lambda: _resolve_day_context(year, month, day),
+    )
+
+
+def get_ganzhi_indices(year: int, month: int, day: int) -> tuple:
+    """年、月、日柱六十甲子序号（不含农历、节气，供批量计算）"""
+    year_month = _year_month_ganzhi(year, month, day)
+    if year_month is None:
+        # 超出节气表范围，退回 sxtwl
+        d = get_day(year, month, day)
+        year_gz, month_gz = d.getYearGZ(), d.getMonthGZ()
+        year_month = (ganzhi_index(year_gz.tg, year_gz.dz),
+                      ganzhi_index(month_gz.tg, month_gz.dz))
+    return year_month[0], year_month[1], day_ganzhi_index(solar_to_jdn(year, month, day))
+
+
+def _resolve_day_context(year: int, month: int, day: int) -> DayContext:
+    """解析一天的历法上下文（查表与算术，节气表范围内不调用 sxtwl）"""
+    year_gz, month_gz, day_gz = get_ganzhi_indices(year, month, day)
+    return DayContext(
+        year=year,
+        month=month,
+        day=day,
+        year_gz=year_gz,
+        month_gz=month_gz,
+        day_gz=day_gz,
+        lunar=_lunar_info(*_lunar_fields(year, month, day)),
+        jieqi=_find_current_jieqi(year, month, day),
+    )
 
 
 def get_lunar_date(year: int, month: int, day: int) -> dict:
     """获取农历日期信息"""
-    d = get_day(year, month, day)
-    lunar_y = d.getLunarYear()
-    lunar_m = d.getLunarMonth()
-    lunar_d = d.getLunarDay()
-    is_leap = d.isLunarLeap()
-
-    # 农历日中文
-    lunar_day_names = [
-        "", "初一", "初二", "初三", "初四", "初五", "初六", "初七", "初八", "初九", "初十",
-        "十一", "十二", "十三", "十四", "十五", "十六", "十七", "十八", "十九", "二十",
-        "廿一", "廿二", "廿三", "廿四", "廿五", "廿六", "廿七", "廿八", "廿九", "三十",
-    ]
-    lunar_month_names = [
-        "", "正月", "二月", "三月", "四月", "五月", "六月",
-        "七月", "八月", "九月", "十月", "冬月", "腊月",
-    ]
-
-    return {
-        "year": lunar_y,
-        "month": lunar_m,
-        "day": lunar_d,
-        "is_leap": is_leap,
-        "month_name": ("闰" if is_leap else "") + lunar_month_names[lunar_m],
-        "day_name": lunar_day_names[lunar_d],
-    }
+    return dict(get_day_context(year, month, day).lunar)
 
 
 def get_four_pillars_raw(year: int, month: int, day: int, hour: int) -> dict:
@@ -125,108 +499,131 @@ def get_four_pillars_raw(year: int, month: int, day: int, hour: int) -> dict:
     hour: 0-23 小时
     返回: {"year": "甲子", "month": "丙寅", "day": "戊午", "hour": "壬子"}
     """
-    return {
-        "year": get_year_ganzhi(year, month, day),
-        "month": get_month_ganzhi(year, month, day),
-        "day": get_day_ganzhi(year, month, day),
-        "hour": get_hour_ganzhi(year, month, day, hour),
-    }
+    pillars = _hour_cache.get_or_compute(
+        (year, month, day, (hour + 1) // 2),
+        lambda: get_day_context(year, month, day).four_pillars(hour),
+    )
+    return dict(pillars)
 
 
 def find_jieqi_in_range(year: int, month_start: int, month_end: int) -> list:
     """查找指定年份月份范围内的所有节气
     返回: [(jieqi_index, jieqi_name, year, month, day, hour, minute), ...]
     """
-    results = []
-    for m in range(month_start, month_end + 1):
-        for d_num in range(1, 32):
-            try:
-                day = get_day(year, m, d_num)
-                if day.hasJieQi():
-                    jq_idx = day.getJieQi()
-                    jq_jd = day.getJieQiJD()
-                    y, mo, da, h, mi = jd_to_datetime(jq_jd)
-                    results.append((jq_idx, JIEQI_NAMES[jq_idx], y, mo, da, h, mi))
-            except Exception:
-                pass
-    return results
+    entries = get_jieqi_table().entries
+    lo = bisect_left(entries, (year, month_start))
+    hi = bisect_left(entries, (year, month_end + 1))
+    return [(e[6], JIEQI_NAMES[e[6]]) + e[:5] for e in entries[lo:hi]]
 
 
 def find_surrounding_jie(year: int, month: int, day: int) -> dict:
     """找到指定日期前后最近的两个'节'（非中气），用于八字定月和大运起运
-    返回: {"prev_jie": {...}, "next_jie": {...}, "current_jie_index": int}
+    返回: {"prev_jie": {...}, "next_jie": {...}}
     """
-    from datetime import date, timedelta
-
-    target = date(year, month, day)
-    prev_jie = None
-    next_jie = None
-
-    # 向前搜索60天，找前一个节
-    for delta in range(0, 60):
-        check = target - timedelta(days=delta)
-        d = get_day(check.year, check.month, check.day)
-        if d.hasJieQi():
-            jq_idx = d.getJieQi()
-            if jq_idx in JIE_INDICES:
-                jq_jd = d.getJieQiJD()
-                y, mo, da, h, mi = jd_to_datetime(jq_jd)
-                jie_dt = date(y, mo, da)
-                if jie_dt <= target:
-                    prev_jie = {
-                        "index": jq_idx,
-                        "name": JIEQI_NAMES[jq_idx],
-                        "date": jie_dt,
-                        "year": y, "month": mo, "day": da,
-                        "hour": h, "minute": mi,
-                    }
-                    break
-
-    # 向后搜索60天，找下一个节
-    for delta in range(1, 60):
-        check = target + timedelta(days=delta)
-        d = get_day(check.year, check.month, check.day)
-        if d.hasJieQi():
-            jq_idx = d.getJieQi()
-            if jq_idx in JIE_INDICES:
-                jq_jd = d.getJieQiJD()
-                y, mo, da, h, mi = jd_to_datetime(jq_jd)
-                next_jie = {
-                    "index": jq_idx,
-                    "name": JIEQI_NAMES[jq_idx],
-                    "date": date(y, mo, da),
-                    "year": y, "month": mo, "day": da,
-                    "hour": h, "minute": mi,
-                }
-                break
+    table = get_jieqi_table()
+    jie_entries = table.jie_entries
+    pos = bisect_right(table.jie_days, date(year, month, day).toordinal())
 
+    prev_jie = _jieqi_entry_to_dict(jie_entries[pos - 1]) if pos > 0 else None
+    next_jie = _jieqi_entry_to_dict(jie_entries[pos]) if pos < len(jie_entries) else None
     return {"prev_jie": prev_jie, "next_jie": next_jie}
 
 
+def get_solar_months(year: int) -> list:
+    """立春年 year 的 12 个节令月（寅月至丑月），按节气表的实际换月日划分
+    返回: [(起始日 date, 结束日 date（不含）, 月柱六十甲子序号), ...]
+    """
+    table = get_jieqi_table()
+    month_days = table.month_days
+    # 立春在 2 月 3–5 日、惊蛰在 3 月 5–6 日，3 月 1 日必在寅月
+    pos = bisect_right(month_days, date(year, 3, 1).toordinal()) - 1
+    if pos < 0 or pos + 12 >= len(month_days):
+        raise ValueError(f"{year} 年超出节气表范围")
+    return [
+        (date.fromordinal(month_days[i]), date.fromordinal(month_days[i + 1]),
+         table.month_ganzhi[i][1])
+        for i in range(pos, pos + 12)
+    ]
+
+
 def find_current_jieqi(year: int, month: int, day: int) -> dict:
     """找到当前日期所属的节气（所有24节气，含节和气）
     返回: {"index": int, "name": str, "date": date, ...}
     """
-    from datetime import date, timedelta
-
-    target = date(year, month, day)
-
-    # 向前搜索40天找当前所属节气
-    for delta in range(0, 40):
-        check = target - timedelta(days=delta)
-        d = get_day(check.year, check.month, check.day)
-        if d.hasJieQi():
-            jq_idx = d.getJieQi()
-            jq_jd = d.getJieQiJD()
-            y, mo, da, h, mi = jd_to_datetime(jq_jd)
-            jie_dt = date(y, mo, da)
-            if jie_dt <= target:
-                return {
-                    "index": jq_idx,
-                    "name": JIEQI_NAMES[jq_idx],
-                    "date": jie_dt,
-                    "year": y, "month": mo, "day": da,
-                    "hour": h, "minute": mi,
-                    "days_since": (target - jie_dt).days,
-                }
-    return {}
+    return dict(get_day_context(year, month, day).jieqi)
+
+
+def _find_current_jieqi(year: int, month: int, day: int) -> JieqiInfo:
+    """find_current_jieqi 的无缓存实现"""
+    table = get_jieqi_table()
+    days, entries = table.days, table.entries
+    target = date(year, month, day).toordinal()
+    pos = bisect_right(days, target)
+    if pos == 0 or pos == len(days):
+        return EMPTY_JIEQI  # 超出节气表范围
+
+    y, mo, da, h, mi, _, jq_idx = entries[pos - 1]
+    return JieqiInfo(jq_idx, y, mo, da, h, mi, target - days[pos - 1])
+
+
+# ============ 四柱反查 ============
+# 年柱六十年一轮、月柱由节令月表给出、日柱六十日一轮：
+# 先按 (年柱, 月柱) 定位节令月，再在月内直接跳到日柱相符的日子（一个节令月至多一天），最后由五鼠遁定时辰。
+REVERSE_LOOKUP_START = date(1900, 1, 1)
+REVERSE_LOOKUP_END = date(2100, 12, 31)
+_ORDINAL_TO_JDN = 1721425  # 儒略日数 = date.toordinal() + 1721425
+
+_month_pillar_index = None  # (年柱, 月柱) → 节令月在 month_days 中的位置列表
+
+
+def _get_month_pillar_index() -> dict:
+    global _month_pillar_index
+    if _month_pillar_index is None:
+        index = {}
+        for pos, key in enumerate(get_jieqi_table().month_ganzhi):
+            index.setdefault(key, []).append(pos)
+        _month_pillar_index = index
+    return _month_pillar_index
+
+
+def _hour_slot_start(slot: int) -> int:
+    """时辰序号 (0早子 1丑 … 11亥 12晚子) → 起始小时"""
+    return 0 if slot == 0 else 2 * slot - 1
+
+
+def _pillar_index(ganzhi) -> int:
+    if isinstance(ganzhi, int):
+        if 0 <= ganzhi < 60:
+            return ganzhi
+    elif ganzhi in JIAZI_INDEX:
+        return JIAZI_INDEX[ganzhi]
+    raise ValueError(f"无效的干支: {ganzhi!r}")
+
+
+def find_dates_by_pillars(year_gz, month_gz, day_gz, hour_gz=None) -> list:
+    """四柱反查公历日期时辰（1900–2100）
+    year_gz/month_gz/day_gz/hour_gz: 干支字符串（如"甲子"）或六十甲子序号；hour_gz 可省略
+    返回: [(date, 起始小时), ...] 按时间排序；起始小时为 0(早子)、1(丑)、3(寅) … 21(亥)、23(晚子)，
+         省略 hour_gz 时为 None。晚子时（23点）时柱按次日日干起。
+    """
+    year_gz, month_gz, day_gz = _pillar_index(year_gz), _pillar_index(month_gz), _pillar_index(day_gz)
+    if hour_gz is not None:
+        hour_gz = _pillar_index(hour_gz)
+        # 五鼠遁：时辰序号 k 的时柱 = 日干起子时 + k，k 在 0–12 内至多一个解
+        slot = (hour_gz - hour_ganzhi_index(day_gz, 0)) % 60
+        if slot > 12:
+            return []
+        hour = _hour_slot_start(slot)
+
+    month_days = get_jieqi_table().month_days
+    lo, hi = REVERSE_LOOKUP_START.toordinal(), REVERSE_LOOKUP_END.toordinal()
+    results = []
+    for pos in _get_month_pillar_index().get((year_gz, month_gz), ()):
+        if pos + 1 >= len(month_days):
+            continue  # 表中最后一个节令月无终点，已超出范围
+        start, end = max(month_days[pos], lo), min(month_days[pos + 1], hi + 1)
+        first_gz = day_ganzhi_index(start + _ORDINAL_TO_JDN)
+        ordinal = start + (day_gz - first_gz) % 60  # 月内日柱相符的那一天
+        if ordinal < end:
+            results.append((date.fromordinal(ordinal), None if hour_gz is None else hour))
+    return results
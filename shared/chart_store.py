@@ -0,0 +1,245 @@
+"""排盘结果本地持久化（SQLite）
+
+按规范化的排盘输入存储 BaziChart / QimenChart 及其 AI 解读，重启后直接读取，
+不必重新排盘，也不必重复调用付费 API。
+
+- 八字键: 公历日期时辰 + 性别；奇门键: 公历日期时辰
+- ENGINE_VERSION 为键的一部分：排盘规则变更后旧条目自动失效（可用 purge_stale 清理）
+- 排盘结果以 to_bytes 紧凑二进制存储（八字约 41 字节，奇门约 63 字节），不依赖 pickle
+- PRAGMA user_version 记录表结构版本，版本不符时重建（缓存数据可丢弃）
+- WAL 模式，读写互不阻塞；每个线程各用一个连接（Streamlit 会话运行在不同线程）
+- 仅作缓存：数据库不可用（路径不可写、磁盘满、文件损坏等）时记录日志并照常排盘，不影响页面
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 排盘引擎版本：修改排盘规则（节气表、起运、局数、盘面等）时递增
+ENGINE_VERSION = "1"
+# 表结构版本
+SCHEMA_VERSION = 2
+
+DEFAULT_DB_PATH = os.environ.get(
+    "CHART_STORE_PATH",
+    str(Path(__file__).resolve().parent.parent / ".cache" / "charts.sqlite3"),
+)
+
+BAZI, QIMEN = "bazi", "qimen"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS charts (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    engine_version TEXT NOT NULL,
+    data BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (kind, key, engine_version)
+);
+CREATE TABLE IF NOT EXISTS readings (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    engine_version TEXT NOT NULL,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (kind, key, variant, engine_version)
+);
+"""
+
+
+def bazi_key(year: int, month: int, day: int, hour: int, gender: str) -> str:
+    """八字规范键，如 1990-05-05T10|男"""
+    return f"{year:04d}-{month:02d}-{day:02d}T{hour:02d}|{gender}"
+
+
+def qimen_key(year: int, month: int, day: int, hour: int) -> str:
+    """奇门规范键，如 2024-02-04T16"""
+    return f"{year:04d}-{month:02d}-{day:02d}T{hour:02d}"
+
+
+def chart_ref(chart) -> tuple:
+    """排盘结果 → (类型, 规范键)"""
+    if hasattr(chart, "four_pillars"):
+        return BAZI, bazi_key(chart.solar_year, chart.solar_month, chart.solar_day,
+                              chart.solar_hour, chart.gender)
+    return QIMEN, qimen_key(chart.solar_year, chart.solar_month, chart.solar_day, chart.solar_hour)
+
+
+def _encode_chart(chart) -> bytes:
+    return chart.to_bytes()
+
+
+def _decode_chart(kind: str, data: bytes):
+    if kind == BAZI:
+        from bazi.calculator import BaziChart
+        return BaziChart.from_bytes(data)
+    from qimen.palace import QimenChart
+    return QimenChart.from_bytes(data)
+
+
+class ChartStore:
+    """SQLite 排盘缓存"""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, engine_version: str = ENGINE_VERSION):
+        self.path = path
+        self.engine_version = engine_version
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    # ---------- 连接 ----------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.path != ":memory:":
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._init_lock:
+                if not self._initialized or self.path == ":memory:":
+                    self._migrate(conn)
+                    self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, conn: sqlite3.Connection):
+        """建表；表结构版本不符时丢弃旧表重建"""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            with conn:
+                conn.execute("DROP TABLE IF EXISTS charts")
+                conn.execute("DROP TABLE IF EXISTS readings")
+        with conn:
+            conn.executescript(_SCHEMA)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ---------- 排盘 ----------
+    def load_chart(self, kind: str, key: str):
+        """读取已存的排盘结果，没有（或数据库不可用）则返回 None"""
+        try:
+            row = self._conn().execute(
+                "SELECT data FROM charts WHERE kind = ? AND key = ? AND engine_version = ?",
+                (kind, key, self.engine_version),
+            ).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("排盘缓存读取失败（%s）: %s", self.path, e)
+            return None
+        if row is None:
+            return None
+        try:
+            return _decode_chart(kind, row[0])
+        except Exception:
+            return None  # 旧格式或损坏，视为未命中
+
+    def save_chart(self, chart) -> bool:
+        """存储排盘结果；数据库不可用时只记日志，返回是否已保存"""
+        kind, key = chart_ref(chart)
+        try:
+            with self._conn() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO charts VALUES (?, ?, ?, ?, ?)",
+                    (kind, key, self.engine_version, _encode_chart(chart), time.time()),
+                )
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("排盘缓存写入失败（%s）: %s", self.path, e)
+            return False
+        return True
+
+    def bazi(self, year: int, month: int, day: int, hour: int, gender: str = "男"):
+        """取八字盘（命中则直接读取，否则排盘并存储）"""
+        chart = self.load_chart(BAZI, bazi_key(year, month, day, hour, gender))
+        if chart is None:
+            from bazi.calculator import calculate_bazi
+            chart = calculate_bazi(year, month, day, hour, gender)
+            self.save_chart(chart)
+        return chart
+
+    def qimen(self, year: int, month: int, day: int, hour: int):
+        """取奇门盘（命中则直接读取，否则排盘并存储）"""
+        chart = self.load_chart(QIMEN, qimen_key(year, month, day, hour))
+        if chart is None:
+            from qimen.yinpan_engine import calculate_qimen
+            chart = calculate_qimen(year, month, day, hour)
+            self.save_chart(chart)
+        return chart
+
+    # ---------- AI 解读 ----------
+    def get_reading(self, chart, variant: str = "") -> str:
+        """读取该盘已存的 AI 解读，没有（或数据库不可用）则返回空串
+        variant 区分同一盘的不同 Prompt：奇门为占问事项，八字为流年年份（bazi.prompts.bazi_reading_variant）
+        """
+        kind, key = chart_ref(chart)
+        try:
+            row = self._conn().execute(
+                "SELECT text FROM readings WHERE kind = ? AND key = ? AND variant = ? AND engine_version = ?",
+                (kind, key, variant, self.engine_version),
+            ).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("解读缓存读取失败（%s）: %s", self.path, e)
+            return ""
+        return row[0] if row else ""
+
+    def save_reading(self, chart, text: str, variant: str = "") -> bool:
+        """保存 AI 解读；失败提示等不入库，数据库不可用时只记日志，返回是否已保存"""
+        from shared.ai_client import is_ai_error
+        if not text or is_ai_error(text):
+            return False
+        kind, key = chart_ref(chart)
+        try:
+            with self._conn() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO readings VALUES (?, ?, ?, ?, ?, ?)",
+                    (kind, key, variant, self.engine_version, text, time.time()),
+                )
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("解读缓存写入失败（%s）: %s", self.path, e)
+            return False
+        return True
+
+    # ---------- 维护 ----------
+    def purge_stale(self) -> int:
+        """删除其他引擎版本的条目，返回删除条数"""
+        with self._conn() as conn:
+            n = conn.execute("DELETE FROM charts WHERE engine_version != ?", (self.engine_version,)).rowcount
+            n += conn.execute("DELETE FROM readings WHERE engine_version != ?", (self.engine_version,)).rowcount
+        return n
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM charts")
+            conn.execute("DELETE FROM readings")
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        count = lambda table: conn.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE engine_version = ?", (self.engine_version,)
+        ).fetchone()[0]
+        return {"charts": count("charts"), "readings": count("readings"), "path": self.path}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ChartStore:
+    """进程内共享的默认 ChartStore"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ChartStore()
+    return _store
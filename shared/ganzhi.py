@@ -118,6 +118,36 @@ SHICHEN_HOURS = [
     (21, 23),  # 亥时 21:00-23:00
 ]
 
+# ============ 整数索引表 ============
+# 天干 0-9、地支 0-11、六十甲子 0-59；内部一律用整数，字符串只在展示/Prompt 边界生成
+# 六十甲子序号 i 的天干 = i % 10，地支 = i % 12
+WUXING = ["木", "火", "土", "金", "水"]
+YINYANG = ["阳", "阴"]
+
+TIANGAN_INDEX = {tg: i for i, tg in enumerate(TIANGAN)}
+DIZHI_INDEX = {dz: i for i, dz in enumerate(DIZHI)}
+JIAZI_INDEX = {gz: i for i, gz in enumerate(JIAZI_60)}
+
+# 天干五行/阴阳: 天干序号 → 五行序号(WUXING) / 阴阳序号(YINYANG)
+TIANGAN_WUXING_IDX = tuple(i // 2 for i in range(10))
+TIANGAN_YINYANG_IDX = tuple(i % 2 for i in range(10))
+# 地支五行/阴阳: 地支序号 → 五行序号 / 阴阳序号
+DIZHI_WUXING_IDX = tuple(WUXING.index(DIZHI_WUXING[dz]) for dz in DIZHI)
+DIZHI_YINYANG_IDX = tuple(i % 2 for i in range(12))
+
+# 地支藏干: 地支序号 → 藏干天干序号元组（本气、中气、余气）
+CANGGAN_IDX = tuple(tuple(TIANGAN_INDEX[tg] for tg in DIZHI_CANGGAN[dz]) for dz in DIZHI)
+# 地支藏干: 地支序号 → 藏干名称元组（不可变，可直接共享）
+CANGGAN_NAMES = tuple(tuple(DIZHI_CANGGAN[dz]) for dz in DIZHI)
+
+# 纳音: 六十甲子序号 → 纳音序号(0-29，两两一组)；NAYIN_NAMES[纳音序号] → 名称
+NAYIN_NAMES = [NAYIN[JIAZI_60[i]] for i in range(0, 60, 2)]
+NAYIN_ID_60 = tuple(i // 2 for i in range(60))
+NAYIN_60 = tuple(NAYIN_NAMES[i // 2] for i in range(60))
+
+# 旬首: 六十甲子序号 → 所在旬首的六十甲子序号
+XUN_HEAD_60 = tuple((i // 10) * 10 for i in range(60))
+
 # 旬首对应六仪（用于奇门遁甲）
 XUN_LIUYI = {
     "甲子": "戊", "甲戌": "己", "甲申": "庚",
@@ -140,24 +170,74 @@ def get_ganzhi_str(tg_index: int, dz_index: int) -> str:
     return TIANGAN[tg_index % 10] + DIZHI[dz_index % 12]
 
 
+def ganzhi_index(tg_index: int, dz_index: int) -> int:
+    """将天干地支索引转为六十甲子序号(0-59)"""
+    return (6 * tg_index - 5 * dz_index) % 60
+
+
+# ============ 干支算术（无需 sxtwl）============
+# 儒略日数(JDN) 2451545 = 2000-01-01 = 戊午日(54)
+_JDN_DAY_GZ_OFFSET = 49
+
+
+def solar_to_jdn(year: int, month: int, day: int) -> int:
+    """公历（格里历）日期转儒略日数(JDN)"""
+    a = (14 - month) // 12
+    y = year + 4800 - a
+    m = month + 12 * a - 3
+    return day + (153 * m + 2) // 5 + 365 * y + y // 4 - y // 100 + y // 400 - 32045
+
+
+def day_ganzhi_index(jdn: int) -> int:
+    """由儒略日数计算日柱六十甲子序号"""
+    return (jdn + _JDN_DAY_GZ_OFFSET) % 60
+
+
+def hour_ganzhi_index(day_gz: int, hour: int) -> int:
+    """五鼠遁：由日柱序号和小时(0-23)计算时柱六十甲子序号
+    甲己还加甲、乙庚丙作初……子时时干由日干定；23点起算次日子时（晚子时换日干）
+    """
+    return ((day_gz % 5) * 12 + (hour + 1) // 2) % 60
+
+
+def year_ganzhi_index(jie_year: int) -> int:
+    """由立春所在公历年计算年柱六十甲子序号（1984年为甲子）"""
+    return (jie_year - 4) % 60
+
+
+def month_ganzhi_index(year_gz: int, month_num: int) -> int:
+    """五虎遁：由年柱序号和节令月(寅月=1 … 丑月=12)计算月柱六十甲子序号
+    甲己之年丙作首、乙庚之岁戊为头……
+    """
+    return ((year_gz % 5) * 12 + 2 + month_num - 1) % 60
+
+
 def get_nayin(ganzhi: str) -> str:
     """获取纳音"""
     return NAYIN.get(ganzhi, "")
 
 
+def jiazi_tg(gz_index: int) -> int:
+    """六十甲子序号 → 天干序号"""
+    return gz_index % 10
+
+
+def jiazi_dz(gz_index: int) -> int:
+    """六十甲子序号 → 地支序号"""
+    return gz_index % 12
+
+
 def get_canggan(dz: str) -> list:
-    """获取地支藏干"""
-    return DIZHI_CANGGAN.get(dz, [])
+    """获取地支藏干（返回副本，修改不影响全局表）"""
+    return list(DIZHI_CANGGAN.get(dz, ()))
 
 
 def find_xun_head(ganzhi: str) -> str:
     """找到干支所在的旬首（甲子/甲戌/甲申/甲午/甲辰/甲寅）"""
-    if ganzhi in JIAZI_60:
-        idx = JIAZI_60.index(ganzhi)
-    else:
+    idx = JIAZI_INDEX.get(ganzhi)
+    if idx is None:
         return ""
-    xun_start = (idx // 10) * 10
-    return JIAZI_60[xun_start]
+    return JIAZI_60[XUN_HEAD_60[idx]]
 
 
 def find_xun_head_liuyi(ganzhi: str) -> str:
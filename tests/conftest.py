@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 项目根目录加入导入路径（直接运行 pytest 时）
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,114 @@
+"""AI 解读缓存：失败结果不缓存、TTL 过期、容量淘汰、磁盘层不可用时退化为内存"""
+
+import pytest
+
+import shared.ai_cache as ai_cache
+import shared.ai_client as ai_client
+from shared.ai_cache import ReadingCache, reading_key
+from shared.ai_client import FAILED_MESSAGE, NO_API_KEY_MESSAGE, STREAM_INTERRUPTED_SUFFIX
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(ai_cache, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "ai_cache.sqlite3")
+
+
+def test_key_depends_on_every_field():
+    base = reading_key("m", "sys", "prompt", 0.8)
+    assert base == reading_key("m", "sys", "prompt", 0.80000001)
+    assert len({base, reading_key("m2", "sys", "prompt", 0.8), reading_key("m", "sys2", "prompt", 0.8),
+                reading_key("m", "sys", "prompt2", 0.8), reading_key("m", "sys", "prompt", 0.7)}) == 5
+
+
+@pytest.mark.parametrize("text", [
+    "", FAILED_MESSAGE, NO_API_KEY_MESSAGE, "[AI解读生成失败：HTTP 500]", "前半段" + STREAM_INTERRUPTED_SUFFIX,
+])
+def test_errors_are_not_cached(cache_path, text):
+    cache = ReadingCache(cache_path)
+    assert not cache.put("k", text)
+    assert cache.get("k") is None
+    assert ReadingCache(cache_path).get("k") is None
+
+
+def test_interrupted_stream_is_not_cached(cache_path, monkeypatch):
+    cache = ReadingCache(cache_path)
+    monkeypatch.setattr(ai_client, "get_reading_cache", lambda: cache)
+
+    def interrupted(prompt, system_prompt, temperature):
+        yield "前半段"
+        yield STREAM_INTERRUPTED_SUFFIX
+
+    monkeypatch.setattr(ai_client, "_stream_tongyi", interrupted)
+    assert "".join(ai_client.stream_tongyi("问", "系统")) == "前半段" + STREAM_INTERRUPTED_SUFFIX
+    assert cache.get(reading_key(ai_client.MODEL, "系统", "问", 0.8)) is None
+
+    def complete(prompt, system_prompt, temperature):
+        yield "完整"
+        yield "解读"
+
+    monkeypatch.setattr(ai_client, "_stream_tongyi", complete)
+    assert "".join(ai_client.stream_tongyi("问", "系统")) == "完整解读"
+    assert cache.get(reading_key(ai_client.MODEL, "系统", "问", 0.8)) == "完整解读"
+
+
+def test_ttl_expiry(cache_path, clock):
+    cache = ReadingCache(cache_path, ttl=100)
+    cache.put("k", "解读")
+    clock.now += 99
+    assert cache.get("k") == "解读"
+    assert ReadingCache(cache_path, ttl=100).get("k") == "解读"  # 磁盘层
+
+    clock.now += 2
+    assert cache.get("k") is None
+    assert ReadingCache(cache_path, ttl=100).get("k") is None
+
+
+def test_memory_lru_eviction_falls_back_to_disk(cache_path):
+    cache = ReadingCache(cache_path, memory_maxsize=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, key * 3)
+    assert cache.stats()["memory_size"] == 2
+    assert cache.evictions == 1
+    assert cache.get("a") == "aaa"
+    assert cache.disk_hits == 1
+
+
+def test_disk_size_eviction_keeps_recently_used(cache_path, clock):
+    cache = ReadingCache(cache_path, disk_maxsize=10)
+    for i in range(64):  # 每 64 次写入清理一次
+        clock.now += 1
+        cache.put(f"k{i}", f"解读{i}")
+    assert cache.stats()["disk_size"] == 10
+
+    fresh = ReadingCache(cache_path)
+    assert fresh.get("k0") is None
+    assert fresh.get("k63") == "解读63"
+
+
+def test_unavailable_disk_degrades_to_memory(tmp_path):
+    blocker = tmp_path / "not_a_dir"
+    blocker.write_text("")
+    cache = ReadingCache(str(blocker / "ai_cache.sqlite3"))
+
+    assert cache.get("k") is None
+    assert cache.put("k", "解读")
+    assert cache.get("k") == "解读"
+    stats = cache.stats()
+    assert stats["disk_errors"] >= 2
+    assert "disk_size" not in stats
+    cache.clear()
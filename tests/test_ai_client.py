@@ -0,0 +1,247 @@
+"""通义千问调用：single-flight 合并、Retry-After 与退避重试、并发上限与排队超时、流式输出、统计
+
+对本地桩服务器发请求，不访问真实 API。
+"""
+
+import json
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import shared.ai_client as ai_client
+from shared.ai_client import (
+    FAILED_MESSAGE, STREAM_INTERRUPTED_SUFFIX, TokenBucket, is_ai_error,
+    call_tongyi, stream_tongyi, get_ai_metrics,
+)
+
+
+class StubServer:
+    """按脚本依次返回 (状态码, 响应头, 正文)，脚本用完后返回 default；记录请求数与最大并发"""
+
+    def __init__(self):
+        self.script = []
+        self.default = (200, {}, "解读")
+        self.delay = 0.0
+        self.stream_chunks = None   # 流式请求时逐条发送的内容
+        self.stream_done = True     # 是否发送 [DONE]
+        self.count = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub._lock:
+                    stub.count += 1
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                    status, headers, text = stub.script.pop(0) if stub.script else stub.default
+                try:
+                    time.sleep(stub.delay)
+                    if status == 200 and body.get("stream"):
+                        self._stream()
+                    else:
+                        self._reply(status, headers, text)
+                finally:
+                    with stub._lock:
+                        stub.active -= 1
+
+            def _reply(self, status, headers, text):
+                data = json.dumps({"choices": [{"message": {"content": text}}]}).encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for chunk in stub.stream_chunks:
+                    event = {"choices": [{"delta": {"content": chunk}}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                if stub.stream_done:
+                    self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1/chat/completions"
+        threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server(monkeypatch):
+    stub = StubServer()
+    monkeypatch.setattr(ai_client, "API_URL", stub.url)
+    monkeypatch.setattr(ai_client, "API_KEY", "test-key")
+    monkeypatch.setattr(ai_client, "MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(ai_client, "BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(ai_client, "BACKOFF_MAX", 1.0)
+    monkeypatch.setattr(ai_client, "QUEUE_TIMEOUT", 5.0)
+    monkeypatch.setattr(ai_client, "_bucket", TokenBucket(0, 1))
+    monkeypatch.setattr(ai_client, "_concurrency", threading.BoundedSemaphore(4))
+    ai_client._metrics.reset()
+    yield stub
+    stub.close()
+
+
+def _concurrently(fn, args_list):
+    results = [None] * len(args_list)
+
+    def run(i, args):
+        results[i] = fn(*args)
+
+    threads = [threading.Thread(target=run, args=(i, args)) for i, args in enumerate(args_list)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_single_flight_coalesces_identical_calls(server):
+    server.delay = 0.3
+    results = _concurrently(lambda: call_tongyi("同一个问题", use_cache=False), [()] * 10)
+    assert results == ["解读"] * 10
+    assert server.count == 1
+    metrics = get_ai_metrics()
+    assert metrics["coalesced"] == 9
+    assert metrics["upstream_calls"] == 1
+    assert metrics["requests"] == 10
+
+
+def test_single_flight_coalesces_identical_streams(server):
+    server.delay = 0.3
+    server.stream_chunks = ["流式", "解读"]
+    results = _concurrently(lambda: "".join(stream_tongyi("同一个问题", use_cache=False)), [()] * 5)
+    assert results == ["流式解读"] * 5
+    assert server.count == 1
+
+
+def test_retry_after_is_honoured(server):
+    server.script = [(429, {"Retry-After": "0.2"}, ""), (429, {"Retry-After": "0.2"}, "")]
+    start = time.monotonic()
+    assert call_tongyi("问题", use_cache=False) == "解读"
+    assert time.monotonic() - start >= 0.4
+    assert server.count == 3
+    metrics = get_ai_metrics()
+    assert metrics["retries"] == 2
+    assert metrics["throttled"] == 2
+    assert metrics["failures"] == 0
+
+
+def test_retry_after_beyond_limit_gives_up(server):
+    server.script = [(429, {"Retry-After": "60"}, "")]
+    assert is_ai_error(call_tongyi("问题", use_cache=False))
+    assert server.count == 1
+
+
+def test_server_errors_back_off_until_attempts_run_out(server):
+    server.default = (503, {}, "")
+    result = call_tongyi("问题", use_cache=False)
+    assert is_ai_error(result)
+    assert server.count == 3
+    metrics = get_ai_metrics()
+    assert metrics["retries"] == 2
+    assert metrics["failures"] == 1
+
+
+def test_client_errors_are_not_retried(server):
+    server.default = (401, {}, "")
+    assert is_ai_error(call_tongyi("问题", use_cache=False))
+    assert server.count == 1
+    assert get_ai_metrics()["failures"] == 1
+
+
+def test_concurrency_cap(server, monkeypatch):
+    monkeypatch.setattr(ai_client, "_concurrency", threading.BoundedSemaphore(2))
+    server.delay = 0.2
+    results = _concurrently(lambda i: call_tongyi(f"问题{i}", use_cache=False), [(i,) for i in range(6)])
+    assert results == ["解读"] * 6
+    assert server.count == 6
+    assert server.max_active == 2
+    metrics = get_ai_metrics()
+    assert metrics["in_flight"] == 0 and metrics["queue_depth"] == 0
+    assert metrics["wait_max"] > 0
+
+
+def test_queue_timeout_returns_failure_message(server, monkeypatch):
+    monkeypatch.setattr(ai_client, "_concurrency", threading.BoundedSemaphore(1))
+    monkeypatch.setattr(ai_client, "QUEUE_TIMEOUT", 0.2)
+    server.delay = 1.0
+    server.stream_chunks = ["长", "解读"]
+
+    holder = threading.Thread(target=lambda: "".join(stream_tongyi("占着名额", use_cache=False)))
+    holder.start()
+    time.sleep(0.3)  # 等第一个流式请求占住唯一的名额
+    start = time.monotonic()
+    result = "".join(stream_tongyi("另一个问题", use_cache=False))
+    assert time.monotonic() - start < 0.9
+    assert is_ai_error(result)
+    holder.join()
+    metrics = get_ai_metrics()
+    assert metrics["queue_timeouts"] == 1
+    assert metrics["queue_depth"] == 0
+
+
+def test_stream_interrupted_after_content(server):
+    server.stream_chunks = ["前半段"]
+    server.stream_done = False
+    result = "".join(stream_tongyi("问题", use_cache=False))
+    assert result == "前半段" + STREAM_INTERRUPTED_SUFFIX
+    assert is_ai_error(result)
+    assert server.count == 1
+
+
+def test_stream_without_api_key(server, monkeypatch):
+    monkeypatch.setattr(ai_client, "API_KEY", "")
+    assert is_ai_error("".join(stream_tongyi("问题", use_cache=False)))
+    assert server.count == 0
+
+
+def test_parse_retry_after():
+    assert ai_client._parse_retry_after("2.5") == 2.5
+    assert ai_client._parse_retry_after("-1") == 0.0
+    assert ai_client._parse_retry_after(None) is None
+    assert ai_client._parse_retry_after("soon") is None
+    assert 8 <= ai_client._parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+
+
+def test_backoff_is_bounded_and_stops(monkeypatch):
+    monkeypatch.setattr(ai_client, "MAX_ATTEMPTS", 4)
+    monkeypatch.setattr(ai_client, "BACKOFF_BASE", 1.0)
+    monkeypatch.setattr(ai_client, "BACKOFF_MAX", 3.0)
+    for attempt, limit in ((0, 1.0), (1, 2.0), (2, 3.0)):
+        delays = [ai_client._retry_delay(attempt) for _ in range(200)]
+        assert all(0 <= d <= limit for d in delays)
+    assert ai_client._retry_delay(3) is None
+
+
+def test_token_bucket_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert 0.15 <= time.monotonic() - start < 1.0
+
+
+def test_failed_message_is_an_error():
+    assert is_ai_error(FAILED_MESSAGE)
@@ -0,0 +1,47 @@
+"""批量排盘：输入校验与输出顺序"""
+
+import io
+import json
+
+import pytest
+
+from batch import parse_gender, process_record, read_records, run_batch
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, "男"), ("", "男"), ("男", "男"), ("女", "女"),
+    ("M", "男"), ("f", "女"), (" Female ", "女"), ("MALE", "男"),
+])
+def test_parse_gender(value, expected):
+    assert parse_gender(value) == expected
+
+
+@pytest.mark.parametrize("value", ["x", "unknown", "2", "男女"])
+def test_invalid_gender_writes_error_row(value):
+    rec = {"year": "1990", "month": "5", "day": "5", "hour": "10", "gender": value}
+    out = process_record(rec, "both")
+    assert "bazi" not in out and "qimen" not in out
+    assert "性别" in out["error"]
+
+
+def test_gender_alias_is_charted_as_canonical():
+    rec = {"year": "1990", "month": "5", "day": "5", "hour": "10", "gender": "F"}
+    assert process_record(rec, "bazi")["bazi"]["gender"] == "女"
+
+
+def test_run_batch_keeps_input_order(tmp_path):
+    path = tmp_path / "in.jsonl"
+    path.write_text(
+        '{"year": 1990, "month": 5, "day": 5, "hour": 10, "gender": "M"}\n'
+        "not json\n"
+        '{"year": 2024, "month": 2, "day": 4, "hour": 16, "gender": "?"}\n'
+        '{"year": 2024, "month": 2, "day": 4, "hour": 16}\n',
+        encoding="utf-8",
+    )
+    out = io.StringIO()
+    assert run_batch(read_records(str(path)), out, mode="both", workers=1, progress_every=0) == 4
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert rows[0]["bazi"]["gender"] == "男" and "qimen" in rows[0]
+    assert rows[1]["input"] == "not json" and "error" in rows[1]
+    assert "性别" in rows[2]["error"]
+    assert rows[3]["bazi"]["gender"] == "男"
@@ -0,0 +1,52 @@
+"""历法：节气表与算术干支对照 sxtwl（1900–2100 每一天）"""
+
+from datetime import date, timedelta
+
+import pytest
+import sxtwl
+
+from shared.calendar_utils import (
+    get_jieqi_table, get_ganzhi_indices, get_day_ganzhi, get_hour_ganzhi,
+    JIEQI_TABLE_START_YEAR, JIEQI_TABLE_END_YEAR,
+)
+from shared.ganzhi import JIAZI_60, ganzhi_index
+
+START, END = date(1900, 1, 1), date(2100, 12, 31)
+
+
+def _gz(gz) -> int:
+    return ganzhi_index(gz.tg, gz.dz)
+
+
+def _days(step: int = 1):
+    current = START
+    while current <= END:
+        yield current
+        current += timedelta(days=step)
+
+
+def test_jieqi_table_matches_sxtwl():
+    expected = sorted({
+        jq.jd: jq.jqIndex
+        for y in range(JIEQI_TABLE_START_YEAR, JIEQI_TABLE_END_YEAR + 1)
+        for jq in sxtwl.getJieQiByYear(y)
+    }.items())
+    entries = get_jieqi_table().entries
+    assert [(e[5], e[6]) for e in entries] == expected
+
+
+def test_year_month_day_pillars_match_sxtwl():
+    for d in _days():
+        day = sxtwl.fromSolar(d.year, d.month, d.day)
+        expected = (_gz(day.getYearGZ()), _gz(day.getMonthGZ()), _gz(day.getDayGZ()))
+        assert get_ganzhi_indices(d.year, d.month, d.day) == expected, d
+        assert get_day_ganzhi(d.year, d.month, d.day) == JIAZI_60[expected[2]], d
+
+
+@pytest.mark.parametrize("hour", range(0, 24))
+def test_hour_pillar_matches_sxtwl(hour):
+    # 每 7 天抽一天，覆盖全部日干与各时辰
+    for d in _days(step=7):
+        day = sxtwl.fromSolar(d.year, d.month, d.day)
+        expected = JIAZI_60[_gz(day.getHourGZ(hour))]
+        assert get_hour_ganzhi(d.year, d.month, d.day, hour) == expected, (d, hour)
@@ -0,0 +1,40 @@
+"""排盘缓存：正常读写，以及数据库不可用时照常排盘"""
+
+from bazi.calculator import calculate_bazi
+from qimen.yinpan_engine import calculate_qimen
+from shared.chart_store import ChartStore
+
+
+def test_store_round_trip(tmp_path):
+    store = ChartStore(str(tmp_path / "charts.sqlite3"))
+    chart = store.bazi(1990, 5, 5, 10, "女")
+    assert chart == calculate_bazi(1990, 5, 5, 10, "女")
+    assert store.stats()["charts"] == 1
+    assert store.bazi(1990, 5, 5, 10, "女") == chart
+
+    assert store.get_reading(chart, variant="2024") == ""
+    assert store.save_reading(chart, "解读", variant="2024")
+    assert store.get_reading(chart, variant="2024") == "解读"
+    assert store.get_reading(chart, variant="2025") == ""
+    assert not store.save_reading(chart, "[AI解读生成失败: 超时]", variant="2024")
+
+
+def test_unavailable_store_falls_back_to_calculation(tmp_path):
+    blocker = tmp_path / "not_a_dir"
+    blocker.write_text("")
+    store = ChartStore(str(blocker / "charts.sqlite3"))
+
+    chart = store.bazi(1990, 5, 5, 10, "男")
+    assert chart == calculate_bazi(1990, 5, 5, 10, "男")
+    qimen = store.qimen(2024, 2, 4, 16)
+    assert qimen.to_dict() == calculate_qimen(2024, 2, 4, 16).to_dict()
+    assert store.get_reading(chart) == ""
+    assert not store.save_reading(chart, "解读")
+
+
+def test_corrupt_database_falls_back_to_calculation(tmp_path):
+    path = tmp_path / "charts.sqlite3"
+    path.write_bytes(b"not a sqlite database" * 100)
+    store = ChartStore(str(path))
+    assert store.bazi(2000, 1, 1, 0) == calculate_bazi(2000, 1, 1, 0)
+    assert store.get_reading(calculate_bazi(2000, 1, 1, 0)) == ""
@@ -0,0 +1,45 @@
+"""综合解读：已有解读复用，失败提示视为没有、重新生成"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+import shared.ai_client as ai_client
+from bazi.calculator import calculate_bazi
+from qimen.yinpan_engine import calculate_qimen
+from shared.ai_client import FAILED_MESSAGE, NO_API_KEY_MESSAGE
+from ui.combined_page import _generate_all, COMBINED_SYSTEM_PROMPT
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    async def fake_acall(prompt, system_prompt="", temperature=0.8, use_cache=True):
+        calls.append(system_prompt)
+        return "综合" if system_prompt == COMBINED_SYSTEM_PROMPT else "新解读"
+
+    monkeypatch.setattr(ai_client, "acall_tongyi", fake_acall)
+    return calls
+
+
+def _run(bazi_text, qimen_text):
+    return asyncio.run(_generate_all(
+        calculate_bazi(1990, 5, 5, 10), calculate_qimen(2024, 2, 4, 16), "",
+        bazi_text=bazi_text, qimen_text=qimen_text,
+    ))
+
+
+def test_existing_readings_are_reused(calls):
+    assert _run("八字旧解读", "奇门旧解读") == ("八字旧解读", "奇门旧解读", "综合")
+    assert calls == [COMBINED_SYSTEM_PROMPT]
+
+
+@pytest.mark.parametrize("failed", [FAILED_MESSAGE, NO_API_KEY_MESSAGE])
+def test_failed_readings_are_regenerated(calls, failed):
+    assert _run(failed, "奇门旧解读") == ("新解读", "奇门旧解读", "综合")
+    assert _run("八字旧解读", failed) == ("八字旧解读", "新解读", "综合")
+    assert calls.count(COMBINED_SYSTEM_PROMPT) == 2
+    assert len(calls) == 4
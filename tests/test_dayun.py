@@ -0,0 +1,73 @@
+"""起运：交节当日出生时，起运时差与月柱、大运干支取同一个节令月边界"""
+
+from datetime import date
+
+import pytest
+
+from bazi.calculator import calculate_bazi
+from shared.calendar_utils import get_jieqi_table
+from shared.ganzhi import solar_to_jdn
+
+
+def _jie_day_births():
+    """节气表内每个节的交节日（去掉首尾），子时初、交节前一小时、交节后一小时、亥时"""
+    table = get_jieqi_table()
+    for e in table.jie_entries[1:-1]:
+        year, month, day, hour = e[:4]
+        for h in sorted({0, max(hour - 1, 0), min(hour + 1, 23), 23}):
+            yield year, month, day, h
+
+
+JIE_DAY_BIRTHS = list(_jie_day_births())
+
+
+def _month_bounds(chart):
+    """月柱所在节令月的起始节、结束节交节时刻（儒略日）"""
+    table = get_jieqi_table()
+    ordinal = date(chart.solar_year, chart.solar_month, chart.solar_day).toordinal()
+    for k, (start, end) in enumerate(zip(table.month_days, table.month_days[1:])):
+        if start <= ordinal < end:
+            assert table.month_ganzhi[k][1] == chart.four_pillars.month.index
+            return table.jie_jds[k], table.jie_jds[k + 1]
+    raise AssertionError("出生日不在节气表内")
+
+
+@pytest.mark.parametrize("gender", ["男", "女"])
+def test_start_age_uses_month_pillar_boundaries(gender):
+    for year, month, day, hour in JIE_DAY_BIRTHS[::7]:
+        chart = calculate_bazi(year, month, day, hour, gender)
+        start, end = _month_bounds(chart)
+        birth = solar_to_jdn(year, month, day) - 0.5 + hour / 24
+        boundary = end if chart.dayun_direction == "顺" else start
+        minutes = round(abs(boundary - birth) * 1440)
+        assert chart.start_dayun_age == max((minutes + 2160) // 4320, 1)
+        # 第一步大运紧接月柱
+        step = 1 if chart.dayun_direction == "顺" else -1
+        assert chart.dayun_list[0].index == (chart.four_pillars.month.index + step) % 60
+
+
+@pytest.mark.parametrize("args, month_gz, first_dayun, start_age", [
+    ((1975, 8, 8, 0, "女"), "甲申", "乙酉", 11),   # 立秋日、交节前：已属申月，顺排量到白露
+    ((2042, 7, 7, 1, "男"), "丁未", "戊申", 11),   # 小暑日、交节前：已属未月，顺排量到立秋
+    ((2042, 7, 7, 1, "女"), "丁未", "丙午", 1),    # 逆排量到当日小暑
+])
+def test_jie_day_examples(args, month_gz, first_dayun, start_age):
+    chart = calculate_bazi(*args)
+    assert chart.four_pillars.month.ganzhi == month_gz
+    assert chart.dayun_list[0].ganzhi == first_dayun
+    assert chart.start_dayun_age == start_age
+
+
+def test_vectorized_start_age_matches_scalar_on_jie_days():
+    np = pytest.importorskip("numpy")
+    from bazi.vectorized import calculate_bazi_arrays
+
+    births = JIE_DAY_BIRTHS[::3]
+    genders = ["男", "女"] * (len(births) // 2 + 1)
+    genders = genders[:len(births)]
+    years, months, days, hours = (np.array(col) for col in zip(*births))
+    arrays = calculate_bazi_arrays(years, months, days, hours, np.array(genders))
+    for i, (birth, gender) in enumerate(zip(births, genders)):
+        chart = calculate_bazi(*birth, gender)
+        assert arrays["start_dayun_age"][i] == chart.start_dayun_age
+        assert arrays["month_gz"][i] == chart.four_pillars.month.index
@@ -0,0 +1,38 @@
+"""局数游标：JuCursor 逐日、逐时推进的结果与 calculate_ju 一致"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from qimen.ju_calculator import JuCursor, calculate_ju
+from shared.calendar_utils import get_hour_ganzhi
+from shared.ganzhi import JIAZI_60
+
+
+def test_next_day_matches_calculate_ju():
+    d, end = date(1900, 2, 1), date(2100, 11, 30)
+    cursor = JuCursor(d.year, d.month, d.day)
+    while d <= end:
+        assert cursor.date == d
+        assert cursor.ju_info() == calculate_ju(d.year, d.month, d.day), d
+        cursor.next_day()
+        d += timedelta(days=1)
+
+
+@pytest.mark.parametrize("start, step", [
+    ((1999, 12, 1, 0), 1),
+    ((2023, 1, 1, 5), 2),
+    ((2087, 6, 1, 23), 5),
+])
+def test_next_hour_matches_calculate_ju(start, step):
+    cursor = JuCursor(*start)
+    for _ in range(2 * 366 * 24 // step):
+        d, hour = cursor.date, cursor.hour
+        assert cursor.ju_info() == calculate_ju(d.year, d.month, d.day, hour), (d, hour)
+        assert JIAZI_60[cursor.hour_gz] == get_hour_ganzhi(d.year, d.month, d.day, hour)
+        cursor.next_hour(step)
+
+
+def test_out_of_table_raises():
+    with pytest.raises(ValueError):
+        JuCursor(1800, 1, 1)
@@ -0,0 +1,15 @@
+"""不可变记录：Pillar、LunarDate、JieqiInfo 不可改写或删除属性"""
+
+import pytest
+
+from bazi.calculator import calculate_bazi
+
+
+def test_records_are_read_only():
+    chart = calculate_bazi(2000, 6, 15, 12)
+    for obj, name in ((chart.four_pillars.day, "index"), (chart.lunar_info, "year"),
+                      (chart.jieqi_info, "index")):
+        with pytest.raises(AttributeError):
+            setattr(obj, name, 0)
+        with pytest.raises(AttributeError):
+            delattr(obj, name)
@@ -0,0 +1,63 @@
+"""四柱反查：find_dates_by_pillars 与逐日穷举（1900–2100）一致"""
+
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+import pytest
+
+from shared.calendar_utils import (
+    find_dates_by_pillars, get_ganzhi_indices, get_hour_ganzhi,
+    REVERSE_LOOKUP_START, REVERSE_LOOKUP_END,
+)
+from shared.ganzhi import JIAZI_60
+
+# 各时辰起始小时：早子 0、丑 1、寅 3 … 亥 21、晚子 23
+SLOT_HOURS = (0,) + tuple(range(1, 24, 2))
+
+
+@pytest.fixture(scope="module")
+def days_by_pillars():
+    """逐日穷举：(年柱, 月柱, 日柱) → [date, ...]"""
+    index = defaultdict(list)
+    d = REVERSE_LOOKUP_START
+    while d <= REVERSE_LOOKUP_END:
+        index[get_ganzhi_indices(d.year, d.month, d.day)].append(d)
+        d += timedelta(days=1)
+    return index
+
+
+def _brute_force(days_by_pillars, year_gz, month_gz, day_gz, hour_gz=None):
+    days = days_by_pillars.get((year_gz, month_gz, day_gz), [])
+    if hour_gz is None:
+        return [(d, None) for d in days]
+    return [(d, h) for d in days for h in SLOT_HOURS
+            if get_hour_ganzhi(d.year, d.month, d.day, h) == JIAZI_60[hour_gz]]
+
+
+def test_matches_brute_force_for_real_pillars(days_by_pillars):
+    rng = random.Random(18)
+    keys = sorted(days_by_pillars)
+    for _ in range(300):
+        year_gz, month_gz, day_gz = rng.choice(keys)
+        assert find_dates_by_pillars(year_gz, month_gz, day_gz) == \
+            _brute_force(days_by_pillars, year_gz, month_gz, day_gz)
+        hour_gz = rng.randrange(60)
+        assert find_dates_by_pillars(year_gz, month_gz, day_gz, hour_gz) == \
+            _brute_force(days_by_pillars, year_gz, month_gz, day_gz, hour_gz)
+
+
+def test_matches_brute_force_for_random_pillars(days_by_pillars):
+    rng = random.Random(1800)
+    for _ in range(300):
+        pillars = [rng.randrange(60) for _ in range(4)]
+        assert find_dates_by_pillars(*pillars[:3]) == _brute_force(days_by_pillars, *pillars[:3])
+        assert find_dates_by_pillars(*pillars) == _brute_force(days_by_pillars, *pillars)
+
+
+def test_accepts_ganzhi_strings(days_by_pillars):
+    d = REVERSE_LOOKUP_START + timedelta(days=40000)
+    year_gz, month_gz, day_gz = get_ganzhi_indices(d.year, d.month, d.day)
+    names = (JIAZI_60[year_gz], JIAZI_60[month_gz], JIAZI_60[day_gz])
+    assert (d, None) in find_dates_by_pillars(*names)
+    assert find_dates_by_pillars(*names) == find_dates_by_pillars(year_gz, month_gz, day_gz)
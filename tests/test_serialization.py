@@ -0,0 +1,71 @@
+"""八字盘、奇门盘二进制编码往返"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from bazi.calculator import calculate_bazi, BaziChart
+from qimen.yinpan_engine import calculate_qimen
+from qimen.palace import QimenChart
+
+_rng = random.Random(20240101)
+_START = date(1901, 3, 1)
+SAMPLES = [
+    (_START + timedelta(days=_rng.randrange(72000)), _rng.randrange(24), _rng.choice(("男", "女")))
+    for _ in range(300)
+]
+
+
+@pytest.mark.parametrize("d, hour, gender", SAMPLES)
+def test_bazi_round_trip(d, hour, gender):
+    chart = calculate_bazi(d.year, d.month, d.day, hour, gender)
+    decoded = BaziChart.from_bytes(chart.to_bytes())
+    assert decoded.to_dict() == chart.to_dict()
+    assert decoded == chart
+
+
+@pytest.mark.parametrize("d, hour, gender", SAMPLES)
+def test_qimen_round_trip(d, hour, gender):
+    chart = calculate_qimen(d.year, d.month, d.day, hour)
+    chart.ai_reading = "解读" if gender == "女" else ""
+    decoded = QimenChart.from_bytes(chart.to_bytes())
+    assert decoded.to_dict() == chart.to_dict()
+    assert decoded == chart
+    assert decoded.ai_reading == chart.ai_reading
+
+
+def test_from_bytes_rejects_bad_data():
+    data = calculate_bazi(2000, 6, 15, 12).to_bytes()
+    with pytest.raises(ValueError):
+        BaziChart.from_bytes(data[:10])
+    with pytest.raises(ValueError):
+        BaziChart.from_bytes(b"X" + data[1:])
+    with pytest.raises(ValueError):
+        QimenChart.from_bytes(calculate_qimen(2000, 6, 15, 12).to_bytes()[:10])
+
+
+@pytest.mark.parametrize("data", [
+    calculate_bazi(1990, 5, 5, 10, "女").to_bytes(),
+    calculate_qimen(2024, 2, 4, 16).to_bytes(),
+], ids=["bazi", "qimen"])
+def test_corrupt_bytes_raise_value_error(data):
+    cls = BaziChart if data[:1] == b"B" else QimenChart
+    for i in range(2, len(data)):
+        for value in (100, 200, 255):
+            corrupt = bytearray(data)
+            corrupt[i] = value
+            try:
+                chart = cls.from_bytes(bytes(corrupt))
+            except ValueError:
+                continue
+            chart.to_dict()  # 未报错的只能是合法取值
+
+
+def test_equality_never_raises():
+    chart = calculate_bazi(1990, 5, 5, 10, "M")
+    assert chart == calculate_bazi(1990, 5, 5, 10, "M")
+    assert chart != calculate_bazi(1990, 5, 5, 10, "男")
+    assert chart != "BaziChart"
+    qimen = calculate_qimen(2024, 2, 4, 16)
+    assert qimen != calculate_qimen(2024, 2, 4, 18)
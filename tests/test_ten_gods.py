@@ -0,0 +1,45 @@
+"""十神查表与原规则函数逐项一致"""
+
+import pytest
+
+from shared.ganzhi import TIANGAN, DIZHI, TIANGAN_WUXING, TIANGAN_YINYANG, WUXING_SHENG, WUXING_KE, get_canggan
+from bazi.ten_gods import (
+    TEN_GODS, TEN_GOD_MATRIX, CANGGAN_TEN_GOD_MATRIX,
+    get_ten_god, get_ten_god_by_index, get_canggan_ten_gods,
+)
+
+
+def rule_ten_god(day_master: str, target: str) -> str:
+    """查表前的原规则实现（五行生克 + 阴阳异同）"""
+    if day_master == target:
+        return "比肩"
+    wx_me, wx_other = TIANGAN_WUXING[day_master], TIANGAN_WUXING[target]
+    same_yinyang = TIANGAN_YINYANG[day_master] == TIANGAN_YINYANG[target]
+    if wx_me == wx_other:
+        return "比肩" if same_yinyang else "劫财"
+    if WUXING_SHENG[wx_me] == wx_other:
+        return "食神" if same_yinyang else "伤官"
+    if WUXING_KE[wx_me] == wx_other:
+        return "偏财" if same_yinyang else "正财"
+    if WUXING_KE[wx_other] == wx_me:
+        return "七杀" if same_yinyang else "正官"
+    if WUXING_SHENG[wx_other] == wx_me:
+        return "偏印" if same_yinyang else "正印"
+    return ""
+
+
+@pytest.mark.parametrize("dm", range(10))
+def test_ten_god_matrix_matches_rules(dm):
+    for tg in range(10):
+        expected = rule_ten_god(TIANGAN[dm], TIANGAN[tg])
+        assert TEN_GODS[TEN_GOD_MATRIX[dm][tg]] == expected
+        assert get_ten_god(TIANGAN[dm], TIANGAN[tg]) == expected
+        assert get_ten_god_by_index(dm, tg) == expected
+
+
+@pytest.mark.parametrize("dm", range(10))
+def test_canggan_ten_god_matrix_matches_rules(dm):
+    for dz in range(12):
+        expected = [rule_ten_god(TIANGAN[dm], cg) for cg in get_canggan(DIZHI[dz])]
+        assert [TEN_GODS[i] for i in CANGGAN_TEN_GOD_MATRIX[dm][dz]] == expected
+        assert get_canggan_ten_gods(dm, dz) == expected
@@ -0,0 +1,64 @@
+"""列式引擎：calculate_bazi_arrays / wuxing_counts 与逐条 calculate_bazi 一致"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from bazi.calculator import calculate_bazi
+from bazi.ten_gods import TEN_GODS
+from bazi.vectorized import calculate_bazi_arrays, wuxing_counts
+from shared.ganzhi import NAYIN_NAMES, WUXING
+
+NAMES = ("year", "month", "day", "hour")
+
+
+@pytest.fixture(scope="module")
+def sample():
+    rng = random.Random(8)
+    start = date(1900, 3, 1)
+    rows = []
+    for _ in range(3000):
+        d = start + timedelta(days=rng.randrange((date(2100, 11, 30) - start).days))
+        rows.append((d.year, d.month, d.day, rng.randrange(24), rng.choice(("男", "女"))))
+    years, months, days, hours, genders = (np.array(col) for col in zip(*rows))
+    return rows, calculate_bazi_arrays(years, months, days, hours, genders)
+
+
+def test_arrays_match_calculate_bazi(sample):
+    rows, arrays = sample
+    for i, row in enumerate(rows):
+        chart = calculate_bazi(*row)
+        fp = chart.four_pillars
+        for name in NAMES:
+            pillar = getattr(fp, name)
+            assert arrays[f"{name}_gz"][i] == pillar.index, (row, name)
+            assert arrays[f"{name}_tg"][i] == pillar.tg
+            assert arrays[f"{name}_dz"][i] == pillar.dz
+            assert NAYIN_NAMES[arrays[f"{name}_nayin"][i]] == pillar.nayin
+        for name in ("year", "month", "hour"):
+            assert TEN_GODS[arrays[f"{name}_ten_god"][i]] == getattr(fp, name).ten_god, (row, name)
+        assert arrays["dayun_forward"][i] == (chart.dayun_direction == "顺"), row
+        assert arrays["start_dayun_age"][i] == chart.start_dayun_age, row
+
+
+def test_wuxing_counts_match_calculate_bazi(sample):
+    rows, arrays = sample
+    counts = wuxing_counts(arrays)
+    assert counts.shape == (len(rows), 5)
+    for i, row in enumerate(rows[:500]):
+        fp = calculate_bazi(*row).four_pillars
+        elements = [p.tg_wuxing for p in fp.all_pillars()] + [p.dz_wuxing for p in fp.all_pillars()]
+        assert list(counts[i]) == [elements.count(wx) for wx in WUXING], row
+
+
+def test_without_genders_skips_dayun():
+    arrays = calculate_bazi_arrays([2000], [6], [15], [12])
+    assert "start_dayun_age" not in arrays and "dayun_forward" not in arrays
+
+
+def test_out_of_table_raises():
+    with pytest.raises(ValueError):
+        calculate_bazi_arrays([1850], [1], [1], [0])
@@ -104,12 +104,20 @@ def render_bazi_page():
 
     if st.button("开始排盘", type="primary", key="bazi_btn"):
         with st.spinner("正在排盘计算..."):
-            from bazi.calculator import calculate_bazi
-            chart = calculate_bazi(
+            from shared.chart_store import get_store
+            store = get_store()
+            chart = store.bazi(
                 solar_year, solar_month, solar_day,
                 birth_hour, gender,
             )
             st.session_state["bazi_chart"] = chart
+            # 同一命盘已有解读则直接带出
+            from bazi.prompts import bazi_reading_variant
+            saved_reading = store.get_reading(chart, variant=bazi_reading_variant())
+            if saved_reading:
+                st.session_state["bazi_ai_result"] = saved_reading
+            else:
+                st.session_state.pop("bazi_ai_result", None)
 
     # ===== 展示区 =====
     if "bazi_chart" not in st.session_state:
@@ -187,7 +195,8 @@ def render_bazi_page():
     st.markdown(
         f"**日主**: <span style='color:{dm_color};font-size:1.2em;font-weight:bold;'>"
         f"{dm}（{dm_wx}）</span> &nbsp; "
-        f"大运方向: **{chart.dayun_direction}排** &nbsp; 起运年龄: **{chart.start_dayun_age}岁**",
+        f"大运方向: **{chart.dayun_direction}排** &nbsp; 起运年龄: **{chart.start_dayun_age}岁**"
+        f"（出生后 {chart.start_dayun_offset[0]}年{chart.start_dayun_offset[1]}个月{chart.start_dayun_offset[2]}天起运）",
         unsafe_allow_html=True,
     )
 
@@ -216,17 +225,34 @@ def render_bazi_page():
         liunian = get_liunian_ganzhi(current_year)
         st.markdown(f"**{current_year}年流年**: {liunian}（{get_nayin(liunian)}）")
 
+        # 流月（按节气换月）
+        from bazi.dayun import iter_liuyue
+        with st.expander(f"{current_year}年流月"):
+            try:
+                liuyue_lines = [
+                    f"- {m.start.month}/{m.start.day}–{m.end.month}/{m.end.day}: "
+                    f"{m.ganzhi}（{m.nayin}）{m.ten_god}"
+                    for m in iter_liuyue(current_year, fp.day_master_index)
+                ]
+                st.markdown("\n".join(liuyue_lines))
+            except ValueError:
+                st.caption("超出节气表范围")
+
     # ===== 命理解读 =====
     st.markdown("### 命理解读")
+    streamed = False
     if st.button("生成解读", key="bazi_ai_btn"):
-        with st.spinner("正在生成解读..."):
-            from bazi.prompts import build_bazi_prompt, BAZI_SYSTEM_PROMPT
-            from shared.ai_client import call_tongyi
-            prompt = build_bazi_prompt(chart)
-            result = call_tongyi(prompt, system_prompt=BAZI_SYSTEM_PROMPT)
-            st.session_state["bazi_ai_result"] = result
-
-    if "bazi_ai_result" in st.session_state:
+        from bazi.prompts import build_bazi_prompt, bazi_reading_variant, BAZI_SYSTEM_PROMPT
+        from shared.ai_client import stream_tongyi
+        from shared.chart_store import get_store
+        prompt = build_bazi_prompt(chart)
+        # 边生成边显示
+        result = st.write_stream(stream_tongyi(prompt, system_prompt=BAZI_SYSTEM_PROMPT))
+        st.session_state["bazi_ai_result"] = result
+        get_store().save_reading(chart, result, variant=bazi_reading_variant())
+        streamed = True
+
+    if not streamed and "bazi_ai_result" in st.session_state:
         st.markdown(st.session_state["bazi_ai_result"])
 
 
@@ -1,5 +1,6 @@
 """综合解读页面 - 整合八字与奇门遁甲的综述寄语"""
 
+import asyncio
 import streamlit as st
 
 
@@ -58,40 +59,104 @@ def _build_combined_prompt(bazi_text: str, qimen_text: str) -> str:
 """
 
 
+async def _generate_all(bazi_chart, qimen_chart, qimen_topic: str,
+                        bazi_text: str = None, qimen_text: str = None):
+    """并发生成八字、奇门解读，两者就绪后立即生成综合解读
+
+    已有的解读直接复用，不再请求（失败提示视为没有，重新生成）。返回 (八字解读, 奇门解读, 综合解读)；
+    任一解读失败时综合解读为 None。
+    """
+    from shared.ai_client import acall_tongyi, is_ai_error
+
+    async def bazi_reading():
+        if bazi_text and not is_ai_error(bazi_text):
+            return bazi_text
+        from bazi.prompts import build_bazi_prompt, BAZI_SYSTEM_PROMPT
+        return await acall_tongyi(build_bazi_prompt(bazi_chart), system_prompt=BAZI_SYSTEM_PROMPT)
+
+    async def qimen_reading():
+        if qimen_text and not is_ai_error(qimen_text):
+            return qimen_text
+        from qimen.prompts import build_qimen_prompt, QIMEN_SYSTEM_PROMPT
+        return await acall_tongyi(build_qimen_prompt(qimen_chart, divination_topic=qimen_topic),
+                                  system_prompt=QIMEN_SYSTEM_PROMPT)
+
+    bazi_result, qimen_result = await asyncio.gather(bazi_reading(), qimen_reading())
+    if is_ai_error(bazi_result) or is_ai_error(qimen_result):
+        return bazi_result, qimen_result, None
+    combined = await acall_tongyi(_build_combined_prompt(bazi_result, qimen_result),
+                                  system_prompt=COMBINED_SYSTEM_PROMPT, temperature=0.7)
+    return bazi_result, qimen_result, combined
+
+
 def render_combined_page():
     st.subheader("综合解读")
     st.caption("基于八字命理与奇门遁甲的分析结论，融合生成一段完整的、富有温度的文字表达")
 
+    from shared.ai_client import is_ai_error
+
+    bazi_chart = st.session_state.get("bazi_chart")
+    qimen_chart = st.session_state.get("qm_chart")
     bazi_result = st.session_state.get("bazi_ai_result")
     qimen_result = st.session_state.get("qm_ai_result")
-
-    has_bazi = bool(bazi_result)
-    has_qimen = bool(qimen_result)
+    # 单页生成失败时留下的失败提示不算已就绪，生成综合解读时重新生成
+    bazi_failed = bool(bazi_result) and is_ai_error(bazi_result)
+    qimen_failed = bool(qimen_result) and is_ai_error(qimen_result)
+    if bazi_failed:
+        bazi_result = None
+    if qimen_failed:
+        qimen_result = None
+
+    # 有解读直接用；只排了盘的，生成综合解读时一并并发生成
+    has_bazi = bool(bazi_result) or bazi_chart is not None
+    has_qimen = bool(qimen_result) or qimen_chart is not None
 
     # 状态提示
     col1, col2 = st.columns(2)
     with col1:
-        if has_bazi:
+        if bazi_result:
             st.success("八字解读 - 已就绪", icon=None)
+        elif bazi_failed and has_bazi:
+            st.info("八字解读 - 上次生成失败（将与综合解读一并重新生成）")
+        elif has_bazi:
+            st.info("八字解读 - 未生成（将与综合解读一并生成）")
         else:
-            st.warning("八字解读 - 未生成（请先在「八字排盘」中生成解读）")
+            st.warning("八字解读 - 未排盘（请先在「八字排盘」中排盘）")
     with col2:
-        if has_qimen:
+        if qimen_result:
             st.success("奇门解读 - 已就绪", icon=None)
+        elif qimen_failed and has_qimen:
+            st.info("奇门解读 - 上次生成失败（将与综合解读一并重新生成）")
+        elif has_qimen:
+            st.info("奇门解读 - 未生成（将与综合解读一并生成）")
         else:
-            st.warning("奇门解读 - 未生成（请先在「奇门遁甲阴盘」中生成解读）")
+            st.warning("奇门解读 - 未排盘（请先在「奇门遁甲阴盘」中起局）")
 
     if not (has_bazi and has_qimen):
-        st.info("请先分别完成八字和奇门的排盘及解读，然后回到本页生成综合解读。")
+        st.info("请先分别完成八字和奇门的排盘，然后回到本页生成综合解读。")
         return
 
     if st.button("生成综合解读", type="primary", key="combined_btn"):
         with st.spinner("正在融合两套体系的分析，生成综合文字..."):
             try:
-                from shared.ai_client import call_tongyi
-                prompt = _build_combined_prompt(bazi_result, qimen_result)
-                result = call_tongyi(prompt, system_prompt=COMBINED_SYSTEM_PROMPT, temperature=0.7)
-                st.session_state["combined_result"] = result
+                from shared.chart_store import get_store
+                qimen_topic = st.session_state.get("qm_saved_topic", "")
+                new_bazi, new_qimen, result = asyncio.run(_generate_all(
+                    bazi_chart, qimen_chart, qimen_topic,
+                    bazi_text=bazi_result, qimen_text=qimen_result,
+                ))
+                store = get_store()
+                if not bazi_result and not is_ai_error(new_bazi):
+                    st.session_state["bazi_ai_result"] = new_bazi
+                    from bazi.prompts import bazi_reading_variant
+                    store.save_reading(bazi_chart, new_bazi, variant=bazi_reading_variant())
+                if not qimen_result and not is_ai_error(new_qimen):
+                    st.session_state["qm_ai_result"] = new_qimen
+                    store.save_reading(qimen_chart, new_qimen, variant=qimen_topic)
+                if result is None:
+                    st.error(new_bazi if is_ai_error(new_bazi) else new_qimen)
+                else:
+                    st.session_state["combined_result"] = result
             except Exception as e:
                 st.error(f"综合解读生成出错：{e}")
 
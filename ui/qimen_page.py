@@ -76,10 +76,17 @@ def render_qimen_page():
     if st.button("起盘", type="primary", key="qm_btn"):
         with st.spinner("正在起盘计算..."):
             try:
-                from qimen.yinpan_engine import calculate_qimen
-                chart = calculate_qimen(solar_year, solar_month, solar_day, qm_hour)
+                from shared.chart_store import get_store
+                store = get_store()
+                chart = store.qimen(solar_year, solar_month, solar_day, qm_hour)
                 st.session_state["qm_chart"] = chart
                 st.session_state["qm_saved_topic"] = divination_topic
+                # 同一时辰、同一事项已有解读则直接带出
+                saved_reading = store.get_reading(chart, variant=divination_topic)
+                if saved_reading:
+                    st.session_state["qm_ai_result"] = saved_reading
+                else:
+                    st.session_state.pop("qm_ai_result", None)
             except Exception as e:
                 st.error(f"起盘计算出错：{e}")
                 return
@@ -126,18 +133,22 @@ def render_qimen_page():
     # 获取保存的占卜事项
     saved_topic = st.session_state.get("qm_saved_topic", "")
 
+    streamed = False
     if st.button("生成解读", key="qm_ai_btn"):
-        with st.spinner("正在生成解读..."):
-            try:
-                from qimen.prompts import build_qimen_prompt, QIMEN_SYSTEM_PROMPT
-                from shared.ai_client import call_tongyi
-                prompt = build_qimen_prompt(chart, divination_topic=saved_topic)
-                result = call_tongyi(prompt, system_prompt=QIMEN_SYSTEM_PROMPT)
-                st.session_state["qm_ai_result"] = result
-            except Exception as e:
-                st.error(f"解读生成出错：{e}")
-
-    if "qm_ai_result" in st.session_state:
+        try:
+            from qimen.prompts import build_qimen_prompt, QIMEN_SYSTEM_PROMPT
+            from shared.ai_client import stream_tongyi
+            from shared.chart_store import get_store
+            prompt = build_qimen_prompt(chart, divination_topic=saved_topic)
+            # 边生成边显示
+            result = st.write_stream(stream_tongyi(prompt, system_prompt=QIMEN_SYSTEM_PROMPT))
+            st.session_state["qm_ai_result"] = result
+            get_store().save_reading(chart, result, variant=saved_topic)
+            streamed = True
+        except Exception as e:
+            st.error(f"解读生成出错：{e}")
+
+    if not streamed and "qm_ai_result" in st.session_state:
         st.markdown(st.session_state["qm_ai_result"])
 
 